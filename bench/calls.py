@@ -0,0 +1,28 @@
+from src.simple_language import SimpleLanguage
+from src.lexer import Lexer
+from src.parser import Parser
+import time
+
+# Call-heavy recursive programs; run with 'python -m bench.calls' from the repository root.
+programs = {
+    'fib(20)': 'fun fib(n) {\nif n < 2 {\nret n\n}\nret fib(n - 1) + fib(n - 2)\n}\nx := fib(20)',
+    'facrec(40) x 1000': 'fun facrec(x) {\nif x = 0 {\nret 1\n} else {\nret facrec(x-1) * x\n}\n}\n'
+                         'i := 0\nwhile i < 1000 {\nx := facrec(40)\ni := i + 1\n}',
+    'early ret in loop x 20000': 'fun find(n) {\ni := 0\nwhile true {\nif i = n {\nret i\n}\ni := i + 1\n}\n}\n'
+                                 'j := 0\nwhile j < 20000 {\nx := find(3)\nj := j + 1\n}'
+}
+
+def bench(backend, source, repeat=3):
+    program = Parser(Lexer(source).lex()).parse()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        SimpleLanguage.backends[backend]().interpret(program)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == '__main__':
+    for name, source in programs.items():
+        for backend in SimpleLanguage.backends:
+            print('{:28} {:8} {:8.3f}s'.format(name, backend, bench(backend, source)))
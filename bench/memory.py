@@ -0,0 +1,94 @@
+from src.lexer import Lexer
+from src.parser import Parser
+import src.syntaxtree as syntaxtree
+import tracemalloc
+import gc
+import os
+import re
+
+# Memory held by parsed programs; run with 'python -m bench.memory' from the repository root.
+# The parser's hash-consed nodes are compared with two copies of the same trees, one object per
+# node like the parser would build without hash-consing: with the plain classes the nodes used
+# to be, and with classes that only have __slots__.
+def generate(copies):
+    # The example program 'copies' times, with the identifiers of each copy renamed, so that the
+    # copies have no equal functions or statements; only literals and the like can be shared.
+    with open(os.path.join(os.path.dirname(__file__), '..', 'test', 'example.si')) as f:
+        source = f.read()
+    kept = set(Lexer.keywords) | {'print'}
+
+    def rename(i):
+        return lambda match: match.group() if match.group()[0] == '\'' or match.group() in kept else '{}_{}'.format(match.group(), i)
+    return '\n'.join(re.sub(r"'[^']*'|[A-Za-z_]\w*", rename(i), source) for i in range(copies))
+
+def node_classes():
+    return [cls for cls in vars(syntaxtree).values() if isinstance(cls, type) and 'accept' in vars(cls)]
+
+def fields(cls):
+    return [slot for slot in cls.__slots__ if slot != '__weakref__']
+
+def plain_class(cls):
+    names = fields(cls)
+
+    def __init__(self, *values):
+        for name, value in zip(names, values):
+            setattr(self, name, value)
+    return type(cls.__name__, (), {'__init__': __init__})
+
+def slots_class(cls):
+    names = fields(cls)
+
+    def __init__(self, *values):
+        for name, value in zip(names, values):
+            setattr(self, name, value)
+    return type(cls.__name__, (), {'__slots__': tuple(names), '__init__': __init__})
+
+def rebuild(node, classes):
+    # a copy of the tree 'node' with a new object for every occurrence of a node
+    cls = type(node)
+    if cls not in classes:
+        return node  # a value or an operator
+    values = []
+    for name in fields(cls):
+        value = getattr(node, name)
+        if type(value) is list:
+            values.append([rebuild(child, classes) for child in value])
+        else:
+            values.append(rebuild(value, classes))
+    return classes[cls](*values)
+
+def count_nodes(node):
+    cls = type(node)
+    if not hasattr(cls, 'accept'):
+        return 0
+    count = 1
+    for name in fields(cls):
+        value = getattr(node, name)
+        for child in (value if type(value) is list else [value]):
+            count += count_nodes(child)
+    return count
+
+def traced(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def measure(copies):
+    tokens = Lexer(generate(copies)).lex()
+    program, interned = traced(lambda: Parser(tokens).parse())
+    sizes = []
+    for make_class in (plain_class, slots_class):
+        classes = {cls: make_class(cls) for cls in node_classes()}
+        _, size = traced(lambda: rebuild(program, classes))
+        sizes.append(size)
+    return count_nodes(program), sizes + [interned]
+
+if __name__ == '__main__':
+    print('{:>6} {:>8} {:>21} {:>21} {:>21}'.format('copies', 'nodes', 'plain', '__slots__', 'interned'))
+    for copies in [10, 100, 1000]:
+        nodes, sizes = measure(copies)
+        print('{:6} {:8} {}'.format(copies, nodes, ' '.join(
+            '{:8.2f} MB {:5.1f} B/n'.format(size / 2 ** 20, size / nodes) for size in sizes)))
@@ -0,0 +1,255 @@
+from src.syntaxtree import *
+from src.mytoken import TokenType
+from src.environment import Environment
+from src.resolver import Resolver, UNASSIGNED, UnassignedError
+from src.function import NORMAL, TailCall, tail_call
+from src.print_function import PrintFunction, to_string
+
+class CompiledFunction:
+    # A frame is a list whose first element is the tuple of the globals and the frames of the
+    # enclosing function calls (innermost last), followed by one element per local variable.
+    def __init__(self, name, nargs, padding, body, frames, env):
+        self.name = name
+        self.nargs = nargs
+        self.padding = padding
+        self.body = body
+        self.frames = frames
+        self.env = env
+
+    def invoke(self, interpreter, values):
+        result = self.body(self.new_frame(values))
+        while type(result) is TailCall:
+            function = result.function
+            if type(function) is not CompiledFunction:
+                return function.invoke(interpreter, result.values)
+            result = function.body(function.new_frame(result.values))
+        return None if result is NORMAL else result
+
+    def new_frame(self, values):
+        if len(values) == self.nargs:
+            frame = [self.frames, *values]
+        else:
+            frame = [self.frames, *values[:self.nargs]]
+            frame.extend([UNASSIGNED] * (self.nargs + 1 - len(frame)))
+        frame.extend(self.padding)
+        return frame
+
+    def __repr__(self):
+        return 'CompiledFunction({})'.format(self.name)
+
+class ClosureInterpreter:
+    def __init__(self, env=None):
+        if env is None:
+            self.globals = Environment({})
+        else:
+            self.globals = env
+        self.globals['print'] = PrintFunction()
+
+    def interpret(self, program):
+        ClosureCompiler(self).compile(program)([(self.globals,)])
+        return self.globals
+
+    def interpret_expr(self, expr):
+        return ClosureCompiler(self).compile_expr(expr)([(self.globals,)])
+
+    def to_string(self, value):
+        return to_string(value)
+
+class ClosureCompiler:
+    # Turns every node into a Python closure taking the current frame. Statements return
+    # NORMAL to fall through or the value of the 'ret' that ended the enclosing function. The
+    # globals are read from the frame, so the same closures can run with different globals;
+    # their names have to be those of the interpreter's globals, for the resolver.
+    def __init__(self, interpreter, resolver=None):
+        self.interpreter = interpreter
+        self.resolver = Resolver(interpreter.globals.keys()) if resolver is None else resolver
+
+    def compile(self, program):
+        self.resolver.declare_globals(program)
+        return program.accept(self)
+
+    def compile_expr(self, expr):
+        return expr.accept(self)
+
+    def load(self, name):
+        resolved = self.resolver.resolve(name)
+        if resolved is None:
+            return lambda frame: frame[0][0][name]
+        depth, slot = resolved
+        slot += 1
+        if depth == 0:
+            def load_local(frame):
+                value = frame[slot]
+                if value is UNASSIGNED:
+                    raise UnassignedError(name)
+                return value
+            return load_local
+
+        def load_deref(frame):
+            value = frame[0][-depth][slot]
+            if value is UNASSIGNED:
+                raise UnassignedError(name)
+            return value
+        return load_deref
+
+    def store(self, name, right):
+        resolved = self.resolver.resolve(name)
+        if resolved is None:
+            def store_global(frame):
+                frame[0][0][name] = right(frame)
+                return NORMAL
+            return store_global
+        depth, slot = resolved
+        slot += 1
+        if depth == 0:
+            def store_local(frame):
+                frame[slot] = right(frame)
+                return NORMAL
+            return store_local
+
+        def store_deref(frame):
+            frame[0][-depth][slot] = right(frame)
+            return NORMAL
+        return store_deref
+
+    def visit_program(self, program):
+        stmts = tuple(stmt.accept(self) for stmt in program.stmts)
+        if len(stmts) == 1:
+            return stmts[0]
+
+        def block(frame):
+            for stmt in stmts:
+                result = stmt(frame)
+                if result is not NORMAL:
+                    return result
+            return NORMAL
+        return block
+
+    def visit_assign(self, assign_stmt):
+        return self.store(assign_stmt.left.name, assign_stmt.right.accept(self))
+
+    def visit_fun(self, fun):
+        name = fun.name.name
+        nargs = len(fun.args)
+        scope = self.resolver.begin_function(fun)
+        try:
+            body = fun.body.accept(self)
+        finally:
+            self.resolver.end_function()
+        padding = [UNASSIGNED] * (len(scope) - nargs)
+        if self.resolver.in_function():
+            return self.store(name, lambda frame: CompiledFunction(name, nargs, padding, body, frame[0] + (frame,), frame[0][0]))
+        return self.store(name, lambda frame: CompiledFunction(name, nargs, padding, body, frame[0], frame[0][0]))
+
+    def visit_funcall(self, funcall):
+        interpreter = self.interpreter
+        callee = funcall.callee.accept(self)
+        args = [arg.accept(self) for arg in funcall.args]
+        if not args:
+            return lambda frame: callee(frame).invoke(interpreter, [])
+        elif len(args) == 1:
+            arg, = args
+            return lambda frame: callee(frame).invoke(interpreter, [arg(frame)])
+        return lambda frame: callee(frame).invoke(interpreter, [arg(frame) for arg in args])
+
+    def visit_ret(self, ret):
+        call = tail_call(ret)
+        if call is None or not self.resolver.in_function():
+            return ret.expr.accept(self)
+        callee = call.callee.accept(self)
+        args = [arg.accept(self) for arg in call.args]
+        return lambda frame: TailCall(callee(frame), [arg(frame) for arg in args])
+
+    def visit_if(self, if_stmt):
+        cond = if_stmt.cond.accept(self)
+        left = if_stmt.left.accept(self)
+        right = if_stmt.right.accept(self)
+        return lambda frame: left(frame) if cond(frame) else right(frame)
+
+    def visit_while(self, while_stmt):
+        cond = while_stmt.cond.accept(self)
+        body = while_stmt.body.accept(self)
+
+        def loop(frame):
+            while cond(frame):
+                result = body(frame)
+                if result is not NORMAL:
+                    return result
+            return NORMAL
+        return loop
+
+    def visit_exprstmt(self, exprstmt):
+        expr = exprstmt.expr.accept(self)
+
+        def stmt(frame):
+            expr(frame)
+            return NORMAL
+        return stmt
+
+    def visit_binary(self, binary):
+        left = binary.left.accept(self)
+        right = binary.right.accept(self)
+        op = binary.op
+        if op == TokenType.PLUS:
+            return lambda frame: left(frame) + right(frame)
+        elif op == TokenType.MINUS:
+            return lambda frame: left(frame) - right(frame)
+        elif op == TokenType.MUL:
+            return lambda frame: left(frame) * right(frame)
+        elif op == TokenType.DIV:
+            return lambda frame: left(frame) / right(frame)
+        elif op == TokenType.POW:
+            return lambda frame: left(frame) ** right(frame)
+        raise CompileError('Unknown binary operator {}.'.format(op))
+
+    def visit_unary(self, unary):
+        expr = unary.expr.accept(self)
+        if unary.op == TokenType.MINUS:
+            return lambda frame: -expr(frame)
+        return expr
+
+    def visit_grouping(self, grouping):
+        return grouping.expr.accept(self)
+
+    def visit_literal(self, literal):
+        value = literal.value
+        return lambda frame: value
+
+    def visit_identifier(self, identifier):
+        return self.load(identifier.name)
+
+    def visit_logicalbinary(self, logicalbinary):
+        left = logicalbinary.left.accept(self)
+        right = logicalbinary.right.accept(self)
+        if logicalbinary.op == TokenType.OR:
+            return lambda frame: left(frame) or right(frame)
+        return lambda frame: left(frame) and right(frame)
+
+    def visit_logicalunary(self, logicalunary):
+        expr = logicalunary.expr.accept(self)
+        return lambda frame: not expr(frame)
+
+    def visit_comparison(self, comparison):
+        left = comparison.left.accept(self)
+        right = comparison.right.accept(self)
+        op = comparison.op
+        if op == TokenType.L:
+            return lambda frame: left(frame) < right(frame)
+        elif op == TokenType.LE:
+            return lambda frame: left(frame) <= right(frame)
+        elif op == TokenType.G:
+            return lambda frame: left(frame) > right(frame)
+        elif op == TokenType.GE:
+            return lambda frame: left(frame) >= right(frame)
+        elif op == TokenType.EQUAL:
+            return lambda frame: left(frame) == right(frame)
+        raise CompileError('Unknown comparison operator {}.'.format(op))
+
+    def visit_stringbinary(self, stringbinary):
+        left = stringbinary.left.accept(self)
+        right = stringbinary.right.accept(self)
+        return lambda frame: to_string(left(frame)) + to_string(right(frame))
+
+class CompileError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
@@ -0,0 +1,253 @@
+from array import array
+from src.syntaxtree import *
+from src.mytoken import TokenType
+from src.resolver import Resolver
+from src.function import tail_call
+
+class OpCode:
+    LOAD_CONST = 0
+    LOAD_GLOBAL = 1
+    STORE_GLOBAL = 2
+    POP = 3
+    ADD = 4
+    SUB = 5
+    MUL = 6
+    DIV = 7
+    POW = 8
+    NEG = 9
+    JUMP_IF_FALSE_OR_POP = 10
+    JUMP_IF_TRUE_OR_POP = 11
+    NOT = 12
+    L = 13
+    LE = 14
+    G = 15
+    GE = 16
+    EQUAL = 17
+    CONCAT = 18
+    JUMP = 19
+    JUMP_IF_FALSE = 20
+    CALL = 21
+    RET = 22
+    MAKE_FUNCTION = 23
+    LOAD_LOCAL = 24
+    STORE_LOCAL = 25
+    LOAD_DEREF = 26
+    STORE_DEREF = 27
+    TAIL_CALL = 28
+
+op_names = {value: name for name, value in vars(OpCode).items() if not name.startswith('_')}
+
+def deref_arg(depth, slot):
+    return depth << 16 | slot
+
+class Code:
+    # Every instruction takes two slots in 'instructions': the opcode and its argument.
+    # The first 'nargs' of the 'local_names' are the arguments of the function.
+    def __init__(self, name, nargs, local_names):
+        self.name = name
+        self.nargs = nargs
+        self.local_names = local_names
+        self.instructions = array('l')
+        self.constants = []
+        self.names = []
+        self.deref_names = {}
+
+    def disassemble(self):
+        lines = []
+        for pc in range(0, len(self.instructions), 2):
+            op, arg = self.instructions[pc], self.instructions[pc + 1]
+            lines.append('{:4} {:15} {}'.format(pc, op_names[op], arg))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return 'Code({})'.format(self.name)
+
+class Compiler:
+    def __init__(self, resolver=None):
+        self.resolver = Resolver() if resolver is None else resolver
+        self.code = None
+        self.binary_ops = {
+            TokenType.PLUS: OpCode.ADD,
+            TokenType.MINUS: OpCode.SUB,
+            TokenType.DIV: OpCode.DIV,
+            TokenType.MUL: OpCode.MUL,
+            TokenType.POW: OpCode.POW
+        }
+        self.comparison_ops = {
+            TokenType.L: OpCode.L,
+            TokenType.LE: OpCode.LE,
+            TokenType.G: OpCode.G,
+            TokenType.GE: OpCode.GE,
+            TokenType.EQUAL: OpCode.EQUAL
+        }
+
+    def compile(self, program):
+        self.resolver.declare_globals(program)
+        return self.compile_code(program, Code('<program>', 0, []))
+
+    def compile_code(self, program, code):
+        previous = self.code
+        self.code = code
+        try:
+            program.accept(self)
+            self.emit(OpCode.LOAD_CONST, self.constant(None))
+            self.emit(OpCode.RET)
+            return self.code
+        finally:
+            self.code = previous
+
+    def compile_expr(self, expr):
+        previous = self.code
+        self.code = Code('<expr>', 0, [])
+        try:
+            expr.accept(self)
+            self.emit(OpCode.RET)
+            return self.code
+        finally:
+            self.code = previous
+
+    def emit(self, op, arg=0):
+        self.code.instructions.append(op)
+        self.code.instructions.append(arg)
+        return len(self.code.instructions) - 2
+
+    def patch(self, pc, target):
+        self.code.instructions[pc + 1] = target
+
+    def here(self):
+        return len(self.code.instructions)
+
+    def constant(self, value):
+        for i, c in enumerate(self.code.constants):
+            if type(c) is type(value) and (repr(c) == repr(value) if type(c) is float else c == value):  # 0.0 is not -0.0
+                return i
+        self.code.constants.append(value)
+        return len(self.code.constants) - 1
+
+    def name(self, name):
+        try:
+            return self.code.names.index(name)
+        except ValueError:
+            self.code.names.append(name)
+            return len(self.code.names) - 1
+
+    def emit_load(self, name):
+        resolved = self.resolver.resolve(name)
+        if resolved is None:
+            self.emit(OpCode.LOAD_GLOBAL, self.name(name))
+        elif resolved[0] == 0:
+            self.emit(OpCode.LOAD_LOCAL, resolved[1])
+        else:
+            arg = deref_arg(*resolved)
+            self.code.deref_names[arg] = name
+            self.emit(OpCode.LOAD_DEREF, arg)
+
+    def emit_store(self, name):
+        resolved = self.resolver.resolve(name)
+        if resolved is None:
+            self.emit(OpCode.STORE_GLOBAL, self.name(name))
+        elif resolved[0] == 0:
+            self.emit(OpCode.STORE_LOCAL, resolved[1])
+        else:
+            self.emit(OpCode.STORE_DEREF, deref_arg(*resolved))
+
+    def visit_program(self, program):
+        for stmt in program.stmts:
+            stmt.accept(self)
+
+    def visit_assign(self, assign_stmt):
+        assign_stmt.right.accept(self)
+        self.emit_store(assign_stmt.left.name)
+
+    def visit_fun(self, fun):
+        scope = self.resolver.begin_function(fun)
+        try:
+            code = self.compile_code(fun.body, Code(fun.name.name, len(fun.args), scope.names))
+        finally:
+            self.resolver.end_function()
+        self.code.constants.append(code)
+        self.emit(OpCode.MAKE_FUNCTION, len(self.code.constants) - 1)
+        self.emit_store(fun.name.name)
+
+    def visit_funcall(self, funcall):
+        funcall.callee.accept(self)
+        for arg in funcall.args:
+            arg.accept(self)
+        self.emit(OpCode.CALL, len(funcall.args))
+
+    def visit_ret(self, ret):
+        call = tail_call(ret)
+        if call is not None and self.resolver.in_function():
+            call.callee.accept(self)
+            for arg in call.args:
+                arg.accept(self)
+            self.emit(OpCode.TAIL_CALL, len(call.args))
+        else:
+            ret.expr.accept(self)
+            self.emit(OpCode.RET)
+
+    def visit_if(self, if_stmt):
+        if_stmt.cond.accept(self)
+        jump_to_else = self.emit(OpCode.JUMP_IF_FALSE)
+        if_stmt.left.accept(self)
+        if if_stmt.right.stmts:
+            jump_to_end = self.emit(OpCode.JUMP)
+            self.patch(jump_to_else, self.here())
+            if_stmt.right.accept(self)
+            self.patch(jump_to_end, self.here())
+        else:
+            self.patch(jump_to_else, self.here())
+
+    def visit_while(self, while_stmt):
+        start = self.here()
+        while_stmt.cond.accept(self)
+        jump_to_end = self.emit(OpCode.JUMP_IF_FALSE)
+        while_stmt.body.accept(self)
+        self.emit(OpCode.JUMP, start)
+        self.patch(jump_to_end, self.here())
+
+    def visit_exprstmt(self, exprstmt):
+        exprstmt.expr.accept(self)
+        self.emit(OpCode.POP)
+
+    def visit_binary(self, binary):
+        binary.left.accept(self)
+        binary.right.accept(self)
+        self.emit(self.binary_ops[binary.op])
+
+    def visit_unary(self, unary):
+        unary.expr.accept(self)
+        if unary.op == TokenType.MINUS:
+            self.emit(OpCode.NEG)
+
+    def visit_grouping(self, grouping):
+        grouping.expr.accept(self)
+
+    def visit_literal(self, literal):
+        self.emit(OpCode.LOAD_CONST, self.constant(literal.value))
+
+    def visit_identifier(self, identifier):
+        self.emit_load(identifier.name)
+
+    def visit_logicalbinary(self, logicalbinary):
+        logicalbinary.left.accept(self)
+        if logicalbinary.op == TokenType.OR:
+            jump_to_end = self.emit(OpCode.JUMP_IF_TRUE_OR_POP)
+        else:
+            jump_to_end = self.emit(OpCode.JUMP_IF_FALSE_OR_POP)
+        logicalbinary.right.accept(self)
+        self.patch(jump_to_end, self.here())
+
+    def visit_logicalunary(self, logicalunary):
+        logicalunary.expr.accept(self)
+        self.emit(OpCode.NOT)
+
+    def visit_comparison(self, comparison):
+        comparison.left.accept(self)
+        comparison.right.accept(self)
+        self.emit(self.comparison_ops[comparison.op])
+
+    def visit_stringbinary(self, stringbinary):
+        stringbinary.left.accept(self)
+        stringbinary.right.accept(self)
+        self.emit(OpCode.CONCAT)
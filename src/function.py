@@ -1,30 +1,67 @@
-from src.syntaxtree import Identifier
+from src.syntaxtree import Identifier, Grouping, FunCall
 from src.environment import Environment
 
 class Function:
     def __init__(self, fun, env):
         self.fun = fun
         self.env = env
+        self.calls = 0
+        self.compiled = None  # the Python function the JIT translated the body to
+        self.memo = None  # the results of earlier calls if the body might be pure, see purity.Memo
 
-    def call(self, interpreter, args):
-        tmp = {}
-        for i in range(len(self.fun.args)):
-            tmp[self.fun.args[i].name] = args[i].accept(interpreter)  # eager evaluation
-        new_env = Environment(tmp, parent=self.env)
-        try:
-            interpreter.interpret(self.fun.body, env=new_env)
-        except RetError as r:
-            return r.value
-        return None
+    def invoke(self, interpreter, values):
+        # Runs the body and the tail calls it ends with in a loop, with the memo checked inline
+        # and without calling other methods of Function: the fewer Python frames a call takes,
+        # the deeper programs can recurse.
+        memo = self.memo
+        key = None
+        if memo is not None and memo.active:
+            key, result = memo.lookup(values)
+            if result is not NO_RESULT:
+                return result
+        function = self
+        while True:
+            compiled = function.compiled
+            if compiled is None:
+                function.calls += 1
+                if function.calls == interpreter.jit_threshold:
+                    function.compiled = interpreter.jit.compile(function)
+                result = FALLBACK
+            else:
+                result = compiled(function.env, values)
+            if result is FALLBACK:
+                fun = function.fun
+                tmp = {}
+                for i in range(len(fun.args)):
+                    tmp[fun.args[i].name] = values[i]
+                result = interpreter.execute(fun.body, Environment(tmp, parent=function.env))
+            if type(result) is not TailCall:
+                if result is NORMAL:
+                    result = None
+                break
+            function = result.function
+            values = result.values
+            if type(function) is not Function:
+                result = function.invoke(interpreter, values)
+                break
+        if key is not None:
+            memo.store(key, result)
+        return result
 
-    def __eq__(self, other):
-        if not isinstance(other, Function):
-            return False
-        elif self is other:
-            return True
-        else:
-            return True and self.fun == other.fun and self.env == other.env
+NORMAL = object()  # completion of a statement that did not execute 'ret'
+FALLBACK = object()  # returned by compiled code that cannot run a call, the tree-walker runs it instead
+NO_RESULT = object()  # returned by Memo.lookup for a call whose result is not remembered
 
-class RetError(Exception):
-    def __init__(self, value):
-        self.value = value
\ No newline at end of file
+class TailCall:
+    # Completion of 'ret f(...)': the call is made by the caller's Function.invoke after the
+    # statements of the current call have returned, so tail calls run in constant stack.
+    def __init__(self, function, values):
+        self.function = function
+        self.values = values
+
+def tail_call(ret):
+    # The call a 'ret' statement ends with, which can reuse the stack space of the caller.
+    expr = ret.expr
+    while isinstance(expr, Grouping):
+        expr = expr.expr
+    return expr if isinstance(expr, FunCall) else None
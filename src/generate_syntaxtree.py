@@ -18,31 +18,63 @@ nodes = [
     'Program stmts'
 ]
 
+# All nodes are hash-consed: constructing a node that is structurally equal to one that still
+# exists returns that node, so equality and hashing are identity and take constant time. The
+# instances of a class are found by the values (and types) of the fields of leaves, and by the
+# identities of the children of other nodes, which are hash-consed themselves; they are only kept
+# while they are used, and a node keeps its children alive. Nodes and their lists of children
+# must therefore not be modified.
+by_value = {'Literal', 'Identifier'}
+lists = {'args', 'stmts'}
+
+quoted = {'Identifier'}  # shown with quotes around their field
+
+def key(node, arg):
+    if node in by_value:
+        # 1, 1.0 and true are equal, as are 0.0 and -0.0, and float('nan') is not equal to itself
+        return '(type({0}), repr({0}) if type({0}) is float else {0})'.format(arg)
+    elif arg in lists:
+        return 'tuple(map(id, {}))'.format(arg)
+    else:
+        return 'id({})'.format(arg)
+
 with open('syntaxtree.py', 'w') as f:
+    f.write('from weakref import WeakValueDictionary\n')
+    f.write('from threading import Lock\n')
+    f.write('\n')
+    f.write('lock = Lock()  # taken to add a node, so that threads building equal nodes share one\n')
+    f.write('\n')
     for node in nodes:
         arr = node.split(' ')
         f.write('class {}:\n'.format(arr[0]))
-        f.write('\tdef __init__(self')
-        for arg in arr[1:]:
-            f.write(', {}'.format(arg))
-        f.write('):\n')
+        slots = arr[1:] + ['__weakref__']
+        f.write('\t__slots__ = ({})\n'.format(', '.join('\'{}\''.format(slot) for slot in slots)))
+        f.write('\n')
+        f.write('\tinstances = WeakValueDictionary()\n')
+        f.write('\n')
+        f.write('\tdef __new__(cls, {}):\n'.format(', '.join(arr[1:])))
+        keys = [key(arr[0], arg) for arg in arr[1:]]
+        f.write('\t\tkey = {}\n'.format(keys[0] if len(keys) == 1 else '(' + ', '.join(keys) + ')'))
+        f.write('\t\tnode = cls.instances.get(key)\n')
+        f.write('\t\tif node is None:\n')
+        f.write('\t\t\twith lock:\n')
+        f.write('\t\t\t\tnode = cls.instances.get(key)\n')
+        f.write('\t\t\t\tif node is None:\n')
+        f.write('\t\t\t\t\tnode = object.__new__(cls)\n')
         for arg in arr[1:]:
-            f.write('\t\tself.{} = {}\n'.format(arg, arg))
+            f.write('\t\t\t\t\tnode.{} = {}\n'.format(arg, arg))
+        f.write('\t\t\t\t\tcls.instances[key] = node\n')
+        f.write('\t\treturn node\n')
+        f.write('\n')
+        f.write('\tdef __reduce__(self):\n')  # copies are the same node, without the data of the interpreter
+        f.write('\t\treturn {}, ({}{})\n'.format(arr[0], ', '.join('self.{}'.format(arg) for arg in arr[1:]), ',' if len(arr) == 2 else ''))
         f.write('\n')
         f.write('\tdef accept(self, visitor):\n')
         f.write('\t\treturn visitor.visit_{}(self)\n'.format(arr[0].lower()))
         f.write('\n')
-        f.write('\tdef __eq__(self, other):\n')
-        f.write('\t\tif not isinstance(other, {}): return False\n'.format(arr[0]))
-        f.write('\t\telif self is other: return True\n')
-        f.write('\t\telse:\n')
-        f.write('\t\t\treturn True')
-        for arg in arr[1:]:
-            f.write(' and self.{} == other.{}'.format(arg, arg))
-        f.write('\n\n')
         f.write('\tdef __str__(self):\n')
         f.write('\t\treturn \'{}('.format(arr[0]))
-        f.write(', '.join(['{}'] * len(arr[1:])))
+        f.write(', '.join(['\\\'{}\\\'' if arr[0] in quoted else '{}'] * len(arr[1:])))
         f.write(')\'.format(')
         f.write(', '.join(['str(self.{})'.format(arg) for arg in arr[1:]]))
         f.write(')')
@@ -0,0 +1,118 @@
+from src.lexer import Lexer
+from src.parser import Parser
+from src.mytoken import MyToken
+from src.syntaxtree import Program
+from bisect import bisect_left
+
+class Document:
+    # A source text with its tokens and parsed program, for editors that reparse after every
+    # change. edit() relexes from the line break before the change until the first line break
+    # after it that was a line break of the old text as well, and reparses from the top-level
+    # statement before the change until a statement ends where one ended before. The tokens and
+    # statements outside of that are reused; unchanged subtrees of the reparsed statements are
+    # reused as well, since nodes are hash-consed.
+    def __init__(self, source):
+        self.source = source
+        self.tokens = []
+        self.eol_offsets = []  # of each line break token in the source
+        self.eol_indices = []  # of each line break token in the tokens
+        self.stmts = []
+        self.ends = []  # index of the token after each top-level statement
+        self.tokens, self.eol_offsets, self.eol_indices, _, _ = self.lex(source, 0, 0, 1, 0, 0)
+        self.stmts, self.ends = self.parse(self.tokens, 0, len(self.tokens), None)
+        self.program = Program(self.stmts)
+
+    def edit(self, offset, removed, inserted):
+        # Replaces 'removed' characters at 'offset' with the text 'inserted' and returns the new
+        # program. If the new source cannot be lexed or parsed, the error is raised and the
+        # document is left unchanged.
+        if offset < 0 or removed < 0 or offset + removed > len(self.source):
+            raise ValueError('Edit outside of the source.')
+        source = self.source[:offset] + inserted + self.source[offset + removed:]
+        eol = bisect_left(self.eol_offsets, offset) - 1  # the last line break before the change
+        if eol < 0:
+            start, first, line = 0, 0, 1
+        else:
+            start = self.eol_offsets[eol] + 1
+            first = self.eol_indices[eol] + 1
+            line = self.tokens[first - 1].line + 1
+        tokens, eol_offsets, eol_indices, sync, line_shift = self.lex(
+            source, start, first, line, offset + len(inserted), len(inserted) - removed)
+        changed_end = first + len(tokens)
+        if sync is None:
+            tail_offsets = tail_indices = tail_tokens = []
+            token_shift = None  # nothing after the change is reused
+        else:
+            old_end = self.eol_indices[sync] + 1
+            token_shift = changed_end - old_end
+            tail_offsets = [eol_offset + len(inserted) - removed for eol_offset in self.eol_offsets[sync + 1:]]
+            tail_indices = [index + token_shift for index in self.eol_indices[sync + 1:]]
+            tail_tokens = self.shift_lines(self.tokens[old_end:], line_shift)
+        tokens = self.tokens[:first] + tokens + tail_tokens
+        stmts, ends = self.parse(tokens, first, changed_end, token_shift)
+        self.source = source
+        self.eol_offsets = self.eol_offsets[:eol + 1] + eol_offsets + tail_offsets
+        self.eol_indices = self.eol_indices[:eol + 1] + eol_indices + tail_indices
+        self.tokens = tokens
+        self.stmts = stmts
+        self.ends = ends
+        self.program = Program(stmts)
+        return self.program
+
+    def shift_lines(self, tokens, line_shift):
+        # the tokens may be shared with earlier token lists, so moved ones are copied
+        if not line_shift:
+            return tokens
+        return [MyToken(token.token_type, token.text, token.value, token.line + line_shift) for token in tokens]
+
+    def lex(self, source, start, first, line, changed_end, character_shift):
+        # Lexes 'source' from offset 'start', where the token with index 'first' on 'line' begins.
+        # Stops after the first line break at or after 'changed_end' that was a line break of the
+        # old source, 'character_shift' characters earlier; its index in eol_offsets is returned
+        # as 'sync' together with how much the line numbers after it have changed.
+        lexer = Lexer(source)
+        lexer.line = line
+        tokens = []
+        eol_offsets = []
+        eol_indices = []
+        sync = None
+        old_line = None
+
+        def matches():
+            nonlocal sync, old_line
+            for match in Lexer.pattern.finditer(source, start):
+                yield match
+                if match.lastgroup == 'eol':
+                    position = match.start()
+                    eol_offsets.append(position)
+                    eol_indices.append(first + len(tokens) - 1)
+                    if position >= changed_end:
+                        old = bisect_left(self.eol_offsets, position - character_shift)
+                        if old < len(self.eol_offsets) and self.eol_offsets[old] == position - character_shift:
+                            sync = old
+                            old_line = self.tokens[self.eol_indices[old]].line
+                            return
+        lexer.lex_matches(matches(), tokens.append)
+        line_shift = 0 if sync is None else lexer.line - 1 - old_line
+        return tokens, eol_offsets, eol_indices, sync, line_shift
+
+    def parse(self, tokens, first, changed_end, token_shift):
+        # Parses the statements that may have changed after the tokens from 'first' to
+        # 'changed_end' were replaced; the tokens after them are the old ones, 'token_shift'
+        # places later, unless that is None. A statement that ends right before 'first' is parsed again, since it
+        # might have looked at the token at 'first'.
+        index = bisect_left(self.ends, first)
+        parser = Parser(tokens)
+        parser.index = self.ends[index - 1] if index > 0 else 0
+        stmts = self.stmts[:index]
+        ends = self.ends[:index]
+        for stmt in parser.statements():
+            stmts.append(stmt)
+            ends.append(parser.index)
+            if token_shift is not None and parser.index >= changed_end:
+                old = bisect_left(self.ends, parser.index - token_shift)
+                if old < len(self.ends) and self.ends[old] == parser.index - token_shift:
+                    stmts.extend(self.stmts[old + 1:])
+                    ends.extend(end + token_shift for end in self.ends[old + 1:])
+                    break
+        return stmts, ends
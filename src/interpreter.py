@@ -1,18 +1,45 @@
 from src.syntaxtree import *
 from src.function import *
-from src.print_function import PrintFunction
+from src.print_function import PrintFunction, to_string
 from src.mytoken import TokenType
 from src.environment import Environment
-from operator import add, sub, truediv, mul, pow, or_, and_, not_, lt, le, gt, ge, eq, concat
+from src.jit import JIT
+from src.purity import Memo, analyze
+from weakref import WeakSet
+from operator import add, sub, truediv, mul, pow, lt, le, gt, ge, eq, concat
+
+binary_functions = {
+    TokenType.PLUS: add,
+    TokenType.MINUS: sub,
+    TokenType.DIV: truediv,
+    TokenType.MUL: mul,
+    TokenType.POW: pow
+}
+
+comparison_functions = {
+    TokenType.L: lt,
+    TokenType.LE: le,
+    TokenType.G: gt,
+    TokenType.GE: ge,
+    TokenType.EQUAL: eq
+}
 
 class Interpreter:
-    def __init__(self, env=None):
+    def __init__(self, env=None, jit_threshold=1000, memoize=False, memo_size=1024):
         if env is None:
             self.globals = Environment({})
         else:
             self.globals = env
         self.globals['print'] = PrintFunction()
         self.environment = self.globals
+        self.jit_threshold = jit_threshold  # calls of a Function before it is compiled, None to never compile
+        self.jit = JIT(self)
+        # Remember the results of calls of pure functions, see purity.Memo. Calls that miss the memo
+        # are slower, until a memo that rarely hits is switched off after 'memo_size' misses.
+        self.memoize = memoize
+        self.memo_size = memo_size
+        self.analyses = {}  # Fun -> result of purity.analyze
+        self.memos = WeakSet()
 
     def begin_scope(self):
         self.environment = Environment({}, self.environment)
@@ -22,47 +49,85 @@ class Interpreter:
         self.environment = self.environment.parent
 
     def interpret(self, program, env=None):
+        result = self.execute(program, env)
+        if type(result) is TailCall:
+            result.function.invoke(self, result.values)
+        return self.environment
+
+    def interpret_stream(self, stmts):
+        # Executes top-level statements as they are produced, e.g. by Parser.statements. A 'ret'
+        # ends the program, the remaining statements are not requested.
+        for stmt in stmts:
+            result = self.execute(stmt)
+            if result is not NORMAL:
+                if type(result) is TailCall:
+                    result.function.invoke(self, result.values)
+                break
+        return self.environment
+
+    def execute(self, program, env=None):
+        # Returns NORMAL, the value of the 'ret' that ended the program or a TailCall.
         previous = self.environment
         if env is not None:
             self.environment = env
         try:
-            program.accept(self)
+            return program.accept(self)
         finally:
             self.environment = previous
-        return self.environment
 
     def visit_program(self, program):
         for stmt in program.stmts:
-            stmt.accept(self)
+            result = stmt.accept(self)
+            if result is not NORMAL:
+                return result
+        return NORMAL
 
     def visit_assign(self, assign_stmt):
         right = assign_stmt.right.accept(self)
         self.environment[assign_stmt.left.name] = right
+        return NORMAL
 
     def visit_fun(self, fun):
         function = Function(fun, self.environment)
+        if self.memoize:
+            try:
+                analysis = self.analyses[fun]
+            except KeyError:
+                analysis = self.analyses[fun] = analyze(fun)
+            if analysis is not None:
+                function.memo = Memo(function, *analysis, self.memo_size)
+                self.memos.add(function.memo)
         self.environment[fun.name.name] = function
+        return NORMAL
 
     def visit_funcall(self, funcall):
         function = funcall.callee.accept(self)
-        return function.call(self, funcall.args)
+        return function.invoke(self, [arg.accept(self) for arg in funcall.args])  # eager evaluation
 
     def visit_ret(self, ret):
-        raise RetError(ret.expr.accept(self))
+        expr = tail_call(ret)
+        if expr is not None:
+            function = expr.callee.accept(self)
+            return TailCall(function, [arg.accept(self) for arg in expr.args])
+        return ret.expr.accept(self)
 
     def visit_if(self, if_stmt):
         cond_value = if_stmt.cond.accept(self)
         if cond_value:
-            if_stmt.left.accept(self)
+            return if_stmt.left.accept(self)
         else:
-            if_stmt.right.accept(self)
+            return if_stmt.right.accept(self)
 
     def visit_while(self, while_stmt):
         while while_stmt.cond.accept(self):
-            while_stmt.body.accept(self)
+            result = while_stmt.body.accept(self)
+            if result is not NORMAL:
+                return result
+        return NORMAL
 
     def visit_exprstmt(self, exprstmt):
         exprstmt.expr.accept(self)
+        return NORMAL
 
     def interpret_expr(self, expr):
         return expr.accept(self)
@@ -70,13 +135,7 @@ class Interpreter:
     def visit_binary(self, binary):
         left = binary.left.accept(self)
         right = binary.right.accept(self)
-        return {
-            TokenType.PLUS: add,
-            TokenType.MINUS: sub,
-            TokenType.DIV: truediv,
-            TokenType.MUL: mul,
-            TokenType.POW: pow
-        }[binary.op](left, right)
+        return binary_functions[binary.op](left, right)
 
     def visit_unary(self, unary):
         value = unary.expr.accept(self)
@@ -95,29 +154,23 @@ class Interpreter:
         return self.environment[identifier.name]
 
     def visit_logicalbinary(self, logicalbinary):
+        # Short-circuiting like Python: the right operand is only evaluated if the left one does
+        # not decide the result, and the operand that decided it is returned.
         left = logicalbinary.left.accept(self)
-        right = logicalbinary.right.accept(self)
-        return {
-            TokenType.OR: or_,
-            TokenType.AND: and_
-        }[logicalbinary.op](left, right)
+        if logicalbinary.op == TokenType.OR:
+            return left if left else logicalbinary.right.accept(self)
+        return logicalbinary.right.accept(self) if left else left
 
     def visit_logicalunary(self, logicalunary):
-        value = logicalunary.expr.accept(self)
-        return {
-            TokenType.NOT: not_
-        }[logicalunary.op](value)
+        return not logicalunary.expr.accept(self)
 
     def visit_comparison(self, comparison):
         left = comparison.left.accept(self)
         right = comparison.right.accept(self)
-        return {
-            TokenType.L: lt,
-            TokenType.LE: le,
-            TokenType.G: gt,
-            TokenType.GE: ge,
-            TokenType.EQUAL: eq
-        }[comparison.op](left, right)
+        return comparison_functions[comparison.op](left, right)
+
+    def memo_stats(self):
+        return list(self.memos)
 
     def visit_stringbinary(self, stringbinary):
         left = stringbinary.left.accept(self)
@@ -127,9 +180,4 @@ class Interpreter:
         }[stringbinary.op](self.to_string(left), self.to_string(right))
 
     def to_string(self, value):
-        if value is False:
-            return 'false'
-        elif value is True:
-            return 'true'
-        else:
-            return str(value)
+        return to_string(value)
@@ -0,0 +1,120 @@
+from src.python_translator import PythonTranslator
+from src.resolver import UNASSIGNED, assigned_names
+from src.function import NORMAL, FALLBACK, TailCall, tail_call
+from src.print_function import to_string
+from weakref import WeakKeyDictionary
+
+class JIT:
+    # Translates the body of a hot Function into a Python function taking the environment the
+    # Function was defined in and the argument values. Arguments and the variables the body
+    # creates become Python locals; every other name is looked up in the environment. The Python
+    # function returns what Interpreter.execute would: the value of a 'ret', a TailCall or NORMAL.
+    # Functions that define functions themselves need an environment for their closures and are
+    # left to the tree-walker.
+    #
+    # The tree-walker decides at run time whether an assignment creates a local variable, so the
+    # compiled code checks on every call that none of its locals has been defined in the
+    # enclosing environments since it was compiled, and returns FALLBACK otherwise.
+    #
+    # The translation only depends on the Fun and on which of the names it assigns were defined
+    # in the environment, so it is shared by all Functions of the Fun, e.g. the closures one
+    # function returns, and kept only as long as the Fun.
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.code = WeakKeyDictionary()  # Fun -> {names the body creates: Python function, None if not compiled}
+
+    def compile(self, function):
+        fun = function.fun
+        args = [arg.name for arg in fun.args]
+        created = tuple(name for name in assigned_names(fun.body) if name not in args and name not in function.env)
+        translations = self.code.setdefault(fun, {})
+        try:
+            return translations[created]
+        except KeyError:
+            pass
+        translations[created] = compiled = self.translate(fun, created)
+        return compiled
+
+    def translate(self, fun, created):
+        try:
+            source = FunctionTranslator(fun, created).translate()
+        except JITError:
+            return None
+        namespace = {
+            'NORMAL': NORMAL,
+            'TailCall': TailCall,
+            'FALLBACK': FALLBACK,
+            'UNASSIGNED': UNASSIGNED,
+            'to_string': to_string,
+            'unassigned': unassigned,
+            'interpreter': self.interpreter
+        }
+        exec(compile(source, '<jit {}>'.format(fun.name.name), 'exec'), namespace)
+        return namespace['compiled']
+
+def unassigned(name):
+    raise KeyError(name)  # what the tree-walker's environment raises
+
+class FunctionTranslator(PythonTranslator):
+    def __init__(self, fun, created):
+        super().__init__(indent=1)
+        self.fun = fun
+        self.args = [arg.name for arg in fun.args]
+        # assigned variables that already exist outside keep being assigned there
+        self.locals = set(self.args)
+        self.created = created
+        self.locals.update(created)
+        self.assigned.update(self.args)
+        self.checked = set()  # locals that might be read before they are assigned
+
+    def translate(self):
+        self.block(self.fun.body)
+        self.emit('return NORMAL')
+        body = self.lines
+        self.lines = []
+        if self.created:
+            self.emit('if {}:'.format(' or '.join('{!r} in env'.format(name) for name in self.created)))
+            self.emit('    return FALLBACK')
+        for i, name in enumerate(self.args):
+            self.emit('{} = values[{}]'.format(variable(name), i))
+        for name in sorted(self.checked):
+            self.emit('{} = UNASSIGNED'.format(variable(name)))
+        return '\n'.join(['def compiled(env, values):'] + self.lines + body)
+
+    def visit_assign(self, assign_stmt):
+        name = assign_stmt.left.name
+        right = assign_stmt.right.accept(self)
+        if name in self.locals:
+            self.emit('{} = {}'.format(variable(name), right))
+            self.assigned.add(name)
+        else:
+            self.emit('env[{!r}] = {}'.format(name, right))
+
+    def visit_fun(self, fun):
+        raise JITError('Functions defining functions are not compiled.')
+
+    def visit_funcall(self, funcall):
+        return '{}.invoke(interpreter, [{}])'.format(funcall.callee.accept(self), self.arguments(funcall.args))
+
+    def visit_ret(self, ret):
+        call = tail_call(ret)
+        if call is None:
+            self.emit('return {}'.format(ret.expr.accept(self)))
+        else:
+            self.emit('return TailCall({}, [{}])'.format(call.callee.accept(self), self.arguments(call.args)))
+
+    def visit_identifier(self, identifier):
+        name = identifier.name
+        if name not in self.locals:
+            return 'env[{!r}]'.format(name)
+        if name in self.assigned:
+            return variable(name)
+        self.checked.add(name)
+        return '({0} if {0} is not UNASSIGNED else unassigned({1!r}))'.format(variable(name), name)
+
+def variable(name):
+    return 'v_' + name  # keeps the names of the language apart from those of the generated code
+
+class JITError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
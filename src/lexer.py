@@ -1,118 +1,269 @@
 from src.mytoken import MyToken, TokenType
+from src.token_buffer import TokenBuffer
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import os
+import re
 
 class Lexer:
+    # One pass of a master regular expression over the program; the name of the group that
+    # matched decides the kind of token. Line breaks inside strings do not count as new lines.
+    pattern_source = r"""
+        (?P<space>[ \t]+)
+        |(?P<number>[0-9.]+)
+        |(?P<eol>\n)
+        |(?P<operator>:=|<=|>=|[-(){}+/*^=:<>,#])
+        |'(?P<string>[^']*)'?
+        |(?P<ident>[0-9A-Za-z_]+)
+        |(?P<error>.)
+    """
+    pattern = re.compile(pattern_source, re.VERBOSE | re.DOTALL)
+    bytes_pattern = re.compile(pattern_source.encode(), re.VERBOSE | re.DOTALL)
+    string_pattern = re.compile("'[^']*'?")
+    bytes_string_pattern = re.compile(b"'[^']*'?")
+
+    operators = {
+        '(': TokenType.LPAREN,
+        ')': TokenType.RPAREN,
+        '{': TokenType.LBRACE,
+        '}': TokenType.RBRACE,
+        '-': TokenType.MINUS,
+        '+': TokenType.PLUS,
+        '/': TokenType.DIV,
+        '*': TokenType.MUL,
+        '^': TokenType.POW,
+        '=': TokenType.EQUAL,
+        ':': None,  # only needed for :=
+        ':=': TokenType.ASSIGN,
+        '<': TokenType.L,
+        '<=': TokenType.LE,
+        '>': TokenType.G,
+        '>=': TokenType.GE,
+        ',': TokenType.COMMA,
+        '#': TokenType.HASH
+    }
+
+    keywords = {
+        'if': TokenType.IF,
+        'else': TokenType.ELSE,
+        'while': TokenType.WHILE,
+        'true': TokenType.TRUE,
+        'false': TokenType.FALSE,
+        'or': TokenType.OR,
+        'and': TokenType.AND,
+        'not': TokenType.NOT,
+        'fun': TokenType.FUN,
+        'ret': TokenType.RET
+    }
+
+    keyword_values = {
+        'true': True,
+        'false': False
+    }
+
+    # the token type codes of a TokenBuffer, by the text of the token
+    operator_codes = {text: 0 if token_type is None else token_type.value for text, token_type in operators.items()}
+    keyword_codes = {text: token_type.value for text, token_type in keywords.items()}
+    bytes_operator_codes = {text.encode(): code for text, code in operator_codes.items()}
+    bytes_keyword_codes = {text.encode(): code for text, code in keyword_codes.items()}
+
     def __init__(self, prog):
         self.prog = prog
-        self.index = 0
         self.line = 1
-        self.char_to_token_type = {
-            '(': TokenType.LPAREN,
-            ')': TokenType.RPAREN,
-            '{': TokenType.LBRACE,
-            '}': TokenType.RBRACE,
-            '-': TokenType.MINUS,
-            '+': TokenType.PLUS,
-            '/': TokenType.DIV,
-            '*': TokenType.MUL,
-            '^': TokenType.POW,
-            '=': TokenType.EQUAL,
-            ':': None,  # only needed for :=
-            '<': TokenType.L,
-            '>': TokenType.G,
-            ',': TokenType.COMMA,
-            '#': TokenType.HASH,
-            '\n': TokenType.EOL
-        }
-        self.keywords = {
-            'if': TokenType.IF,
-            'else': TokenType.ELSE,
-            'while': TokenType.WHILE,
-            'true': TokenType.TRUE,
-            'false': TokenType.FALSE,
-            'or': TokenType.OR,
-            'and': TokenType.AND,
-            'not': TokenType.NOT,
-            'fun': TokenType.FUN,
-            'ret': TokenType.RET
-        }
-
-    def current(self):
-        return self.prog[self.index]
-
-    def peek(self):
-        return self.prog[self.index + 1]
-
-    def advance(self):
-        self.index += 1
-        while self.index < len(self.prog) and self.prog[self.index] in ['\t', ' ']:
-            self.index += 1
-
-    def match_number(self):
-        number_string = ''
-        while self.index < len(self.prog) and (self.current().isnumeric() or self.current() == '.'):
-            number_string += self.current()
-            self.index += 1
-        self.index -= 1
-        value = float(number_string) if '.' in number_string else int(number_string)
-        return MyToken(TokenType.NUMBER, number_string, value, self.line)
-
-    def match_char(self):
-        if self.index < len(self.prog) - 1 and self.peek() == '=':
-            if self.current() == ':':
-                self.advance()
-                return MyToken(TokenType.ASSIGN, ':=', None, self.line)
-            elif self.current() == '<':
-                self.advance()
-                return MyToken(TokenType.LE, '<=', None, self.line)
-            elif self.current() == '>':
-                self.advance()
-                return MyToken(TokenType.GE, '>=', None, self.line)
-
-        token_type = self.char_to_token_type[self.current()]
-        token = MyToken(token_type, self.current(), None, self.line)
-        if token_type == TokenType.EOL:
-            token.text = None
-            self.line += 1
-        return token
-
-    def match_string(self):
-        text = ''
-        self.index += 1
-        while self.index < len(self.prog) and self.current() != '\'':
-            text += self.current()
-            self.index += 1
-        return MyToken(TokenType.STRING, text, text, self.line)
-
-    def match_ident_or_keyword(self):
-        text = ''
-        while self.index < len(self.prog) and self.is_valid_ident_char():
-            text += self.current()
-            self.index += 1
-        self.index -= 1
-        if text in self.keywords:
-            token_type = self.keywords[text]
-            value = None
-            if token_type == TokenType.TRUE: value = True
-            elif token_type == TokenType.FALSE: value = False
-            return MyToken(self.keywords[text], text, value, self.line)
-        else:
-            return MyToken(TokenType.IDENT, text, text, self.line)
 
     def lex(self):
         tokens = []
-        while self.index < len(self.prog):
-            c = self.current()
-            if c.isnumeric() or c == '.':
-                tokens.append(self.match_number())
-            elif c in self.char_to_token_type:
-                tokens.append(self.match_char())
-            elif c == '\'':
-                tokens.append(self.match_string())
-            else:
-                tokens.append(self.match_ident_or_keyword())
-            self.advance()
+        self.lex_matches(self.pattern.finditer(self.prog), tokens.append)
         return tokens
 
-    def is_valid_ident_char(self):
-        c = ord(self.current())
-        return 48 <= c <= 57 or 65 <= c <= 90 or 97 <= c <= 122 or c == 95
\ No newline at end of file
+    def lex_stream(self, file, chunk_size=1 << 16):
+        # Yields the tokens of a text file object, read 'chunk_size' characters at a time. The
+        # last match of a chunk might continue in the next one, so it is matched again with it,
+        # unless it is a line break: chunks read from a pipe usually end with a complete line.
+        rest = ''
+        while True:
+            chunk = file.read(chunk_size)
+            text = rest + chunk
+            tokens = []
+            if not chunk:
+                self.lex_matches(self.pattern.finditer(text), tokens.append)
+                yield from tokens
+                return
+            matches = list(self.pattern.finditer(text))  # the pattern matches any character
+            if matches[-1].lastgroup == 'eol':
+                rest = ''
+            else:
+                rest = text[matches.pop().start():]
+            self.lex_matches(matches, tokens.append)
+            yield from tokens
+
+    def lex_matches(self, matches, append):
+        operators = self.operators
+        keywords = self.keywords
+        keyword_values = self.keyword_values
+        line = self.line
+        for match in matches:
+            kind = match.lastgroup
+            if kind == 'ident':
+                text = match.group()
+                token_type = keywords.get(text)
+                if token_type is None:
+                    append(MyToken(TokenType.IDENT, text, text, line))
+                else:
+                    append(MyToken(token_type, text, keyword_values.get(text), line))
+            elif kind == 'space':
+                continue
+            elif kind == 'operator':
+                text = match.group()
+                append(MyToken(operators[text], text, None, line))
+            elif kind == 'eol':
+                append(MyToken(TokenType.EOL, None, None, line))
+                line += 1
+            elif kind == 'number':
+                text = match.group()
+                append(MyToken(TokenType.NUMBER, text, float(text) if '.' in text else int(text), line))
+            elif kind == 'string':
+                text = match.group(kind)
+                append(MyToken(TokenType.STRING, text, text, line))
+            else:
+                raise LexError(line, 'Unexpected character {!r}.'.format(match.group()))
+        self.line = line
+
+    def lex_buffer(self, start=0, end=None):
+        # Like lex, but stores the tokens in a TokenBuffer. 'prog' may also be bytes or a
+        # memory-mapped file, which is then never decoded as a whole. Only the part from 'start'
+        # to 'end' is lexed if given, with offsets that are still relative to all of 'prog'.
+        prog = self.prog
+        if isinstance(prog, str):
+            pattern = self.pattern
+            operator_codes = self.operator_codes
+            keyword_codes = self.keyword_codes
+        else:
+            pattern = self.bytes_pattern
+            operator_codes = self.bytes_operator_codes
+            keyword_codes = self.bytes_keyword_codes
+        buffer = TokenBuffer(prog)
+        add_type = buffer.types.append
+        add_start = buffer.starts.append
+        add_end = buffer.ends.append
+        add_line = buffer.lines.append
+        ident = TokenType.IDENT.value
+        number = TokenType.NUMBER.value
+        string = TokenType.STRING.value
+        eol = TokenType.EOL.value
+        line = self.line
+        for match in pattern.finditer(prog, start, len(prog) if end is None else end):
+            kind = match.lastgroup
+            if kind == 'space':
+                continue
+            elif kind == 'ident':
+                add_type(keyword_codes.get(match.group(), ident))
+            elif kind == 'operator':
+                add_type(operator_codes[match.group()])
+            elif kind == 'eol':
+                add_type(eol)
+            elif kind == 'number':
+                add_type(number)
+            elif kind == 'string':
+                add_type(string)
+            else:
+                raise LexError(line, 'Unexpected character {!r}.'.format(match.group()))
+            token_start, token_end = match.span(kind)
+            add_start(token_start)
+            add_end(token_end)
+            add_line(line)
+            if kind == 'eol':
+                line += 1
+        self.line = line
+        return buffer
+
+    def lex_parallel(self, workers=None, path=None):
+        # Like lex_buffer, but lexes parts of 'prog' in 'workers' processes (by default one per
+        # CPU). 'prog' is split at line breaks outside of strings, so every part can be lexed on
+        # its own once its first line is known, which counting the line breaks before it gives.
+        # A memory-mapped 'prog' is mapped again from 'path' by the workers; otherwise each of
+        # them receives a copy. Starting the processes takes long enough that this only pays off
+        # for sources of many megabytes.
+        if workers is None:
+            workers = os.cpu_count() or 1
+        parts = self.split(workers * 4)  # smaller parts balance the load better
+        buffer = TokenBuffer(self.prog)
+        with ProcessPoolExecutor(workers, initializer=start_worker, initargs=(self.prog if path is None else None, path)) as executor:
+            futures = [executor.submit(lex_part, start, end, line) for start, end, line in parts]
+            for future in futures:  # in order, so the error of the first part that has one is raised
+                types, starts, ends, lines, self.line = future.result()
+                buffer.types.extend(types)
+                buffer.starts.extend(starts)
+                buffer.ends.extend(ends)
+                buffer.lines.extend(lines)
+        return buffer
+
+    def split(self, count):
+        # Returns up to 'count' parts (start, end, first line) of about the same length that end
+        # with a line break outside of a string, except for the last one.
+        prog = self.prog
+        if isinstance(prog, str):
+            quote, newline, strings = '\'', '\n', self.string_pattern
+        else:
+            quote, newline, strings = b'\'', b'\n', self.bytes_string_pattern
+        parts = []
+        start = 0
+        line = self.line
+        for k in range(1, count):
+            scan = start  # known to be outside of a string
+            while True:
+                end = prog.find(newline, max(scan, len(prog) * k // count))
+                if end < 0 or occurrences(prog, quote, scan, end) % 2 == 0:
+                    break
+                closing = prog.find(quote, end)  # of the string the line break is in
+                if closing < 0:
+                    end = -1
+                    break
+                scan = closing + 1
+            if end < 0:
+                break
+            end += 1
+            parts.append((start, end, line))
+            line += occurrences(prog, newline, start, end) - sum(string.count(newline) for string in strings.findall(prog, start, end))
+            start = end
+        parts.append((start, len(prog), line))
+        return parts
+
+    @staticmethod
+    def lex_file(path, workers=1):
+        # The source stays memory-mapped until the returned buffer is closed. With more than one
+        # worker, lex_parallel is used.
+        with open(path, 'rb') as f:
+            try:
+                source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                source = b''  # empty files cannot be mapped
+        if workers == 1 or not source:
+            return Lexer(source).lex_buffer()
+        return Lexer(source).lex_parallel(workers, path)
+
+def occurrences(prog, text, start, end):
+    if isinstance(prog, mmap.mmap):  # has no count method
+        return prog[start:end].count(text)
+    return prog.count(text, start, end)
+
+worker_source = None  # the program a worker process of lex_parallel lexes parts of
+
+def start_worker(prog, path):
+    global worker_source
+    if path is None:
+        worker_source = prog
+    else:
+        with open(path, 'rb') as f:
+            worker_source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def lex_part(start, end, line):
+    lexer = Lexer(worker_source)
+    lexer.line = line
+    buffer = lexer.lex_buffer(start, end)
+    return buffer.types, buffer.starts, buffer.ends, buffer.lines, lexer.line
+
+class LexError(Exception):
+    def __init__(self, line, msg):
+        self.line = line
+        self.msg = msg
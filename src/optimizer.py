@@ -0,0 +1,189 @@
+from src.syntaxtree import *
+from src.mytoken import TokenType
+from src.interpreter import Interpreter
+
+class Optimizer:
+    # Rewrites a program into an equivalent one: operators whose operands are all literals are
+    # folded, as are 'and' and 'or' with a literal left operand, 'if' statements with a literal
+    # condition are replaced by the branch that is taken, loops that never run are dropped and
+    # groupings are unwrapped. Unless 'prune_functions' is False, function definitions whose name
+    # is never read outside of their own body are removed as well; they therefore no longer show
+    # up in the resulting global environment. The input tree is not modified.
+    max_folded_exponent = 128
+
+    def __init__(self, prune_functions=True):
+        self.prune_functions = prune_functions
+        self.interpreter = Interpreter()
+
+    def optimize(self, program):
+        program = program.accept(self)
+        if self.prune_functions:
+            program = FunctionPruner().prune(program)
+        return program
+
+    def fold(self, node):
+        try:
+            return Literal(node.accept(self.interpreter))
+        except Exception:
+            return node  # leave the error to run time, the code might never be reached
+
+    def visit_program(self, program):
+        stmts = []
+        for stmt in program.stmts:
+            result = stmt.accept(self)
+            if isinstance(result, Program):
+                stmts.extend(result.stmts)
+            else:
+                stmts.append(result)
+        return Program(stmts)
+
+    def visit_assign(self, assign_stmt):
+        return Assign(assign_stmt.left, assign_stmt.right.accept(self))
+
+    def visit_fun(self, fun):
+        return Fun(fun.name, fun.args, fun.body.accept(self))
+
+    def visit_funcall(self, funcall):
+        return FunCall(funcall.callee.accept(self), [arg.accept(self) for arg in funcall.args])
+
+    def visit_ret(self, ret):
+        return Ret(ret.expr.accept(self))
+
+    def visit_if(self, if_stmt):
+        cond = if_stmt.cond.accept(self)
+        left = if_stmt.left.accept(self)
+        right = if_stmt.right.accept(self)
+        if isinstance(cond, Literal):
+            return left if cond.value else right  # spliced into the enclosing block
+        return If(cond, left, right)
+
+    def visit_while(self, while_stmt):
+        cond = while_stmt.cond.accept(self)
+        if isinstance(cond, Literal) and not cond.value:
+            return Program([])
+        return While(cond, while_stmt.body.accept(self))
+
+    def visit_exprstmt(self, exprstmt):
+        expr = exprstmt.expr.accept(self)
+        if isinstance(expr, Literal):
+            return Program([])
+        return ExprStmt(expr)
+
+    def visit_binary(self, binary):
+        left = binary.left.accept(self)
+        right = binary.right.accept(self)
+        node = Binary(left, binary.op, right)
+        if not isinstance(left, Literal) or not isinstance(right, Literal):
+            return node
+        if isinstance(left.value, str) or isinstance(right.value, str):
+            return node
+        if binary.op == TokenType.POW and abs(right.value) > self.max_folded_exponent:
+            return node
+        return self.fold(node)
+
+    def visit_unary(self, unary):
+        expr = unary.expr.accept(self)
+        node = Unary(unary.op, expr)
+        return self.fold(node) if isinstance(expr, Literal) else node
+
+    def visit_grouping(self, grouping):
+        return grouping.expr.accept(self)
+
+    def visit_literal(self, literal):
+        return literal
+
+    def visit_identifier(self, identifier):
+        return identifier
+
+    def visit_logicalbinary(self, logicalbinary):
+        left = logicalbinary.left.accept(self)
+        if isinstance(left, Literal):
+            # the left operand alone decides which operand is the result
+            if bool(left.value) == (logicalbinary.op == TokenType.OR):
+                return left
+            return logicalbinary.right.accept(self)
+        return LogicalBinary(left, logicalbinary.op, logicalbinary.right.accept(self))
+
+    def visit_logicalunary(self, logicalunary):
+        expr = logicalunary.expr.accept(self)
+        node = LogicalUnary(logicalunary.op, expr)
+        return self.fold(node) if isinstance(expr, Literal) else node
+
+    def visit_comparison(self, comparison):
+        return self.fold_binary(Comparison, comparison)
+
+    def visit_stringbinary(self, stringbinary):
+        return self.fold_binary(StringBinary, stringbinary)
+
+    def fold_binary(self, node_class, node):
+        left = node.left.accept(self)
+        right = node.right.accept(self)
+        node = node_class(left, node.op, right)
+        if isinstance(left, Literal) and isinstance(right, Literal):
+            return self.fold(node)
+        return node
+
+class FunctionPruner:
+    # A reference from inside a function to its own name (recursion) does not keep it alive,
+    # unless the name is bound more than once and the reference might mean something else.
+    def __init__(self):
+        self.used = set()
+        self.self_used = set()
+        self.bindings = {}
+        self.enclosing = []
+
+    def prune(self, program):
+        self.collect(program)
+        self.used.update(name for name in self.self_used if self.bindings[name] > 1)
+        return self.remove(program)
+
+    def collect(self, node):
+        if isinstance(node, Identifier):
+            if node.name in self.enclosing:
+                self.self_used.add(node.name)
+            else:
+                self.used.add(node.name)
+        elif isinstance(node, Fun):
+            self.bind(node.name.name)
+            self.enclosing.append(node.name.name)
+            self.collect(node.body)
+            self.enclosing.pop()
+        elif isinstance(node, Assign):
+            self.bind(node.left.name)
+            self.collect(node.right)
+        elif isinstance(node, Program):
+            for stmt in node.stmts:
+                self.collect(stmt)
+        elif isinstance(node, FunCall):
+            self.collect(node.callee)
+            for arg in node.args:
+                self.collect(arg)
+        elif isinstance(node, If):
+            self.collect(node.cond)
+            self.collect(node.left)
+            self.collect(node.right)
+        elif isinstance(node, While):
+            self.collect(node.cond)
+            self.collect(node.body)
+        elif isinstance(node, (Binary, LogicalBinary, Comparison, StringBinary)):
+            self.collect(node.left)
+            self.collect(node.right)
+        elif isinstance(node, (Unary, LogicalUnary, Grouping, ExprStmt, Ret)):
+            self.collect(node.expr)
+
+    def bind(self, name):
+        self.bindings[name] = self.bindings.get(name, 0) + 1
+
+    def remove(self, program):
+        stmts = []
+        for stmt in program.stmts:
+            if isinstance(stmt, Fun):
+                if stmt.name.name not in self.used:
+                    continue
+                stmt = Fun(stmt.name, stmt.args, self.remove(stmt.body))
+            elif isinstance(stmt, If):
+                stmt = If(stmt.cond, self.remove(stmt.left), self.remove(stmt.right))
+            elif isinstance(stmt, While):
+                stmt = While(stmt.cond, self.remove(stmt.body))
+            stmts.append(stmt)
+        return Program(stmts)
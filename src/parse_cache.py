@@ -0,0 +1,75 @@
+from src.lexer import Lexer
+from src.parser import Parser, ParseError
+from src.mytoken import TokenType
+from collections import OrderedDict
+from threading import Lock
+
+class ParseCache:
+    # Parsed programs and expressions by their source text, for services that receive the same
+    # sources over and over. The least recently used entries are evicted when there are more than
+    # 'max_entries' of them, or when the UTF-8 encoded sources of the entries add up to more than
+    # 'max_bytes'; the size of a syntax tree grows with that of its source. Sources are parsed
+    # outside of the lock, so two threads may parse the same new source at once, which results
+    # in the same tree since nodes are hash-consed. Sources that do not parse are not cached.
+    def __init__(self, max_entries=1024, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes  # None for no limit
+        self.entries = OrderedDict()  # (source, is_expr) -> (parsed, size), least recently used first
+        self.bytes = 0
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def parse(self, source):
+        return self.get(source, False)
+
+    def parse_expr(self, source):
+        return self.get(source, True)
+
+    def get(self, source, is_expr):
+        key = (source, is_expr)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        parser = Parser(Lexer(source).lex())
+        if is_expr:
+            if parser.is_at_end():
+                raise ParseError(1, 'Expected an expression.')
+            parsed = parser.parse_expr()
+            while not parser.is_at_end() and parser.peek().token_type == TokenType.EOL:
+                parser.consume()
+            if not parser.is_at_end():
+                raise ParseError(parser.peek().line, 'Expected the end of the expression.')
+        else:
+            parsed = parser.parse()
+        with self.lock:
+            if key not in self.entries:
+                size = len(source.encode('utf-8'))
+                self.entries[key] = (parsed, size)
+                self.bytes += size
+                self.evict()
+        return parsed
+
+    def evict(self):
+        while self.entries and (len(self.entries) > self.max_entries or
+                                (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            _, (_, size) = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return 'ParseCache({} entries, {} hits, {} misses, {} evictions)'.format(
+            len(self.entries), self.hits, self.misses, self.evictions)
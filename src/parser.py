@@ -2,37 +2,56 @@ from src.mytoken import TokenType
 from src.syntaxtree import *
 from enum import Enum
 
+class Precedences:
+    HASH = 1
+    OR = 2
+    AND = 3
+    EQUAL = 4
+    L = 5
+    PLUS = 6
+    MUL = 7
+    POW = 8
+    PREFIX = 9
+    CALL = 10
+
+Associativity = Enum('Associativity', 'LEFT RIGHT')
+
 class Parser:
-    def __init__(self, tokens):
+    # Parses with explicit stacks instead of recursion, so that the depth of nesting is only limited
+    # by memory: statements() keeps a stack of the blocks that are open, and parse_expr a stack of
+    # the operators whose operands are still being parsed (a Pratt parser).
+    prefix_nodes = {
+        TokenType.NUMBER: Literal,
+        TokenType.TRUE: Literal,
+        TokenType.FALSE: Literal,
+        TokenType.IDENT: Identifier,
+        TokenType.STRING: Literal,
+        TokenType.PLUS: Unary,
+        TokenType.MINUS: Unary,
+        TokenType.NOT: LogicalUnary,
+        TokenType.LPAREN: Grouping
+    }
+    not_prefix_nodes = {
+        TokenType.PLUS: (Binary, Precedences.PLUS, Associativity.LEFT),
+        TokenType.MINUS: (Binary, Precedences.PLUS, Associativity.LEFT),
+        TokenType.MUL: (Binary, Precedences.MUL, Associativity.LEFT),
+        TokenType.DIV: (Binary, Precedences.MUL, Associativity.LEFT),
+        TokenType.POW: (Binary, Precedences.POW, Associativity.RIGHT),
+        TokenType.OR: (LogicalBinary, Precedences.OR, Associativity.LEFT),
+        TokenType.AND: (LogicalBinary, Precedences.AND, Associativity.LEFT),
+        TokenType.EQUAL: (Comparison, Precedences.EQUAL, Associativity.LEFT),
+        TokenType.L: (Comparison, Precedences.L, Associativity.LEFT),
+        TokenType.LE: (Comparison, Precedences.L, Associativity.LEFT),
+        TokenType.G: (Comparison, Precedences.L, Associativity.LEFT),
+        TokenType.GE: (Comparison, Precedences.L, Associativity.LEFT),
+        TokenType.HASH: (StringBinary, Precedences.HASH, Associativity.LEFT),
+        TokenType.LPAREN: (FunCall, Precedences.CALL, Associativity.LEFT)
+    }
+
+    def __init__(self, tokens, lazy=False):
         self.tokens = tokens
         self.index = 0
-        self.prefix_functions = {
-            TokenType.NUMBER: self.parse_literal,
-            TokenType.TRUE: self.parse_literal,
-            TokenType.FALSE: self.parse_literal,
-            TokenType.IDENT: self.parse_identifier,
-            TokenType.STRING: self.parse_literal,
-            TokenType.PLUS: self.parse_prefix_operator,
-            TokenType.MINUS: self.parse_prefix_operator,
-            TokenType.NOT: self.parse_prefix_logical_operator,
-            TokenType.LPAREN: self.parse_grouping
-        }
-        self.not_prefix_functions = {
-            TokenType.PLUS: (self.parse_infix_operator, Precedences.PLUS, Associativity.LEFT),
-            TokenType.MINUS: (self.parse_infix_operator, Precedences.PLUS, Associativity.LEFT),
-            TokenType.MUL: (self.parse_infix_operator, Precedences.MUL, Associativity.LEFT),
-            TokenType.DIV: (self.parse_infix_operator, Precedences.MUL, Associativity.LEFT),
-            TokenType.POW: (self.parse_infix_operator, Precedences.POW, Associativity.RIGHT),
-            TokenType.OR: (self.parse_infix_logical_operator, Precedences.OR, Associativity.LEFT),
-            TokenType.AND: (self.parse_infix_logical_operator, Precedences.AND, Associativity.LEFT),
-            TokenType.EQUAL: (self.parse_comparison, Precedences.EQUAL, Associativity.LEFT),
-            TokenType.L: (self.parse_comparison, Precedences.L, Associativity.LEFT),
-            TokenType.LE: (self.parse_comparison, Precedences.L, Associativity.LEFT),
-            TokenType.G: (self.parse_comparison, Precedences.L, Associativity.LEFT),
-            TokenType.GE: (self.parse_comparison, Precedences.L, Associativity.LEFT),
-            TokenType.HASH: (self.parse_infix_string_operator, Precedences.HASH, Associativity.LEFT),
-            TokenType.LPAREN: (self.parse_call, Precedences.CALL, Associativity.LEFT)
-        }
+        self.lazy = lazy  # leave function bodies unparsed until they are needed, see LazyProgram
 
     def consume(self):
         token = self.tokens[self.index]
@@ -59,36 +78,93 @@ class Parser:
         return self.index >= len(self.tokens)
 
     def parse(self):
-        program = Program([])
-        while True:
-            token_type = self.peek().token_type
-            if token_type == TokenType.IDENT and self.lookahead(2).token_type == TokenType.ASSIGN:
-                program.stmts.append(self.parse_assignment())
-            elif token_type == TokenType.FUN:
-                program.stmts.append(self.parse_function())
-            elif token_type == TokenType.RET:
-                program.stmts.append(self.parse_ret())
-            elif token_type == TokenType.IF:
-                program.stmts.append(self.parse_if())
-            elif token_type == TokenType.WHILE:
-                program.stmts.append(self.parse_while())
-            elif token_type == TokenType.EOL:
-                self.consume()
-            else:
-                try:
-                    program.stmts.append(ExprStmt(self.parse_expr()))
-                except ParseError:
-                    return program
+        return Program(list(self.statements()))
 
+    def statements(self):
+        # Yields the statements of a block one by one, the top-level statements of a stream as
+        # soon as each of them is complete. A block ends where no statement can be parsed. The
+        # blocks inside the statements are entries [kind, statements of the enclosing block, ...]
+        # of 'blocks'; 'else if' is an entry of its own that wraps the nested 'if' when it is done.
+        blocks = []
+        stmts = None  # of the innermost open block, None at the level statements() was called on
+        while True:
+            stmt = None
             if self.is_at_end():
-                return program
+                block_ended = True
+            else:
+                block_ended = False
+                token_type = self.peek().token_type
+                if token_type == TokenType.IDENT and self.lookahead(2).token_type == TokenType.ASSIGN:
+                    stmt = self.parse_assignment()
+                elif token_type == TokenType.FUN:
+                    name, args = self.parse_function_head()
+                    if self.lazy:
+                        start = self.index
+                        self.skip_block()
+                        body = LazyProgram(self.slice(start, self.index))
+                        self.consume_token(TokenType.RBRACE, skip_newline=True)
+                        stmt = Fun(name, args, body)
+                    else:
+                        blocks.append(['fun', stmts, name, args])
+                        stmts = []
+                elif token_type == TokenType.RET:
+                    stmt = self.parse_ret()
+                elif token_type == TokenType.IF:
+                    blocks.append(['if', stmts, self.parse_if_head()])
+                    stmts = []
+                elif token_type == TokenType.WHILE:
+                    self.consume_token(TokenType.WHILE)
+                    condition = self.parse_expr()
+                    self.consume_token(TokenType.LBRACE, skip_newline=True)
+                    blocks.append(['while', stmts, condition])
+                    stmts = []
+                elif token_type == TokenType.EOL:
+                    self.consume()
+                else:
+                    try:
+                        stmt = ExprStmt(self.parse_expr())
+                    except ParseError:
+                        block_ended = True
+            if block_ended:
+                if not blocks:
+                    return
+                block = blocks.pop()
+                kind, body = block[0], Program(stmts)
+                stmts = block[1]
+                self.consume_token(TokenType.RBRACE, skip_newline=True)
+                if kind == 'fun':
+                    stmt = Fun(block[2], block[3], body)
+                elif kind == 'while':
+                    stmt = While(block[2], body)
+                elif kind == 'else':
+                    stmt = If(block[2], block[3], body)
+                elif self.is_at_end() or self.peek().token_type != TokenType.ELSE:
+                    stmt = If(block[2], body, Program([]))
+                else:
+                    self.consume()
+                    if self.peek().token_type == TokenType.IF:
+                        blocks.append(['else if', stmts, block[2], body])
+                        blocks.append(['if', stmts, self.parse_if_head()])
+                    else:
+                        self.consume_token(TokenType.LBRACE, skip_newline=True)
+                        blocks.append(['else', stmts, block[2], body])
+                    stmts = []
+                while stmt is not None and blocks and blocks[-1][0] == 'else if':
+                    block = blocks.pop()
+                    stmt = If(block[2], block[3], Program([stmt]))
+            if stmt is not None:
+                if stmts is None:
+                    yield stmt
+                else:
+                    stmts.append(stmt)
 
     def parse_assignment(self):
         token = self.consume()
         self.consume_token(TokenType.ASSIGN)
-        return Assign(self.parse_identifier(token), self.parse_expr())
+        return Assign(Identifier(token.value), self.parse_expr())
 
-    def parse_function(self):
+    def parse_function_head(self):
+        # Parses up to the '{' of a function and returns its name and arguments.
         self.consume_token(TokenType.FUN)
         token = self.consume()
         self.consume_token(TokenType.LPAREN)
@@ -96,139 +172,136 @@ class Parser:
         if self.peek().token_type != TokenType.RPAREN:
             while True:
                 arg = self.consume_token(TokenType.IDENT)
-                args.append(self.parse_identifier(arg))
+                args.append(Identifier(arg.value))
                 if self.peek().token_type == TokenType.RPAREN: break
                 self.consume_token(TokenType.COMMA)
         self.consume_token(TokenType.RPAREN)
         self.consume_token(TokenType.LBRACE, skip_newline=True)
-        body = self.parse()
-        self.consume_token(TokenType.RBRACE, skip_newline=True)
-        return Fun(self.parse_identifier(token), args, body)
+        return Identifier(token.value), args
+
+    def skip_block(self):
+        # Moves to the '}' matching the '{' just consumed.
+        depth = 1
+        while not self.is_at_end():
+            token_type = self.peek().token_type
+            if token_type == TokenType.LBRACE:
+                depth += 1
+            elif token_type == TokenType.RBRACE:
+                depth -= 1
+                if depth == 0:
+                    return
+            self.consume()
+        raise ParseError(self.tokens[self.index - 1].line, 'Expected {}.'.format(TokenType.RBRACE))
+
+    def slice(self, start, end):
+        if type(self.tokens) is list:
+            return self.tokens[start:end]
+        return [self.tokens[index] for index in range(start, end)]
 
     def parse_ret(self):
         self.consume_token(TokenType.RET)
         return Ret(self.parse_expr())
 
-    def parse_if(self):
+    def parse_if_head(self):
+        # Parses up to the '{' of an 'if' and returns its condition.
         self.consume_token(TokenType.IF)
         condition = self.parse_expr()
         self.consume_token(TokenType.LBRACE, skip_newline=True)
-        left = self.parse()
-        self.consume_token(TokenType.RBRACE, skip_newline=True)
-        if self.is_at_end():
-            return If(condition, left, Program([]))
-
-        if self.peek().token_type != TokenType.ELSE:
-            return If(condition, left, Program([]))
-        self.consume()
-        if self.peek().token_type == TokenType.IF:
-            right = Program([self.parse_if()])
-        else:
-            self.consume_token(TokenType.LBRACE, skip_newline=True)
-            right = self.parse()
-            self.consume_token(TokenType.RBRACE, skip_newline=True)
-        return If(condition, left, right)
-
-    def parse_while(self):
-        self.consume_token(TokenType.WHILE)
-        condition = self.parse_expr()
-        self.consume_token(TokenType.LBRACE, skip_newline=True)
-        stmts = self.parse()
-        self.consume_token(TokenType.RBRACE, skip_newline=True)
-        return While(condition, stmts)
+        return condition
 
     def parse_expr(self, precedence=0):
-        token = self.consume()
-        try:
-            prefix_function = self.prefix_functions[token.token_type]
-        except KeyError:
-            self.index -= 1  # undo the consume
-            raise ParseError(token.line, 'Could not parse {}.'.format(token.text))
-        left = prefix_function(token)
-        if self.is_at_expr_end():
-            return left
-        else:
-            while precedence < self.get_precedence():
-                token = self.consume()
-                not_prefix_function, function_precedence, associativity = self.not_prefix_functions[token.token_type]
-                left = not_prefix_function(left, token, function_precedence, associativity)
-                if self.is_at_expr_end():
+        # Each entry of 'operators' is an operator, or a call or grouping, waiting for its last
+        # operand: [node class, token, left operand or call arguments, precedence of the
+        # parse_expr it belongs to]. 'precedence' is always that of the innermost operand.
+        operators = []
+        while True:
+            token = self.consume()
+            try:
+                node_class = self.prefix_nodes[token.token_type]
+            except KeyError:
+                self.index -= 1  # undo the consume
+                raise ParseError(token.line, 'Could not parse {}.'.format(token.text))
+            if node_class is Literal or node_class is Identifier:
+                left = node_class(token.value)
+            else:
+                operators.append([node_class, token, None, precedence])
+                precedence = Precedences.PREFIX if node_class is not Grouping else 0
+                continue
+            while True:  # 'left' is complete, continue with the operators that follow it
+                if not self.is_at_expr_end() and precedence < self.get_precedence():
+                    token = self.consume()
+                    node_class, operator_precedence, associativity = self.not_prefix_nodes[token.token_type]
+                    if node_class is FunCall:
+                        if self.peek().token_type == TokenType.RPAREN:
+                            self.consume_token(TokenType.RPAREN)
+                            left = FunCall(left, [])
+                            continue
+                        operators.append([FunCall, token, (left, []), precedence])
+                        precedence = 0
+                    else:
+                        operators.append([node_class, token, left, precedence])
+                        precedence = operator_precedence - (1 if associativity == Associativity.RIGHT else 0)
+                    break
+                if not operators:
                     return left
-            return left
+                node_class, token, operand, precedence = operators.pop()
+                if node_class is FunCall:
+                    callee, args = operand
+                    args.append(left)
+                    if self.peek().token_type != TokenType.RPAREN:
+                        self.consume_token(TokenType.COMMA)
+                        operators.append([FunCall, token, operand, precedence])
+                        precedence = 0
+                        break
+                    self.consume_token(TokenType.RPAREN)
+                    left = FunCall(callee, args)
+                elif node_class is Grouping:
+                    if self.consume().token_type != TokenType.RPAREN:
+                        raise ParseError(token.line, 'Missing \')\'.')
+                    left = Grouping(left)
+                elif operand is None:
+                    left = node_class(token.token_type, left)
+                else:
+                    left = node_class(operand, token.token_type, left)
 
     def get_precedence(self):
         token = self.peek()
         try:
-            _, precedence, _ = self.not_prefix_functions[token.token_type]
+            _, precedence, _ = self.not_prefix_nodes[token.token_type]
             return precedence
         except KeyError:
             return 0
 
-    # Pratt parsing functions ('parselets')
-    def parse_identifier(self, token):
-        return Identifier(token.value)
-
-    def parse_literal(self, token):
-        return Literal(token.value)
-
-    def parse_prefix_operator(self, token):
-        arg = self.parse_expr(Precedences.PREFIX)
-        return Unary(token.token_type, arg)
-
-    def parse_prefix_logical_operator(self, token):
-        arg = self.parse_expr(Precedences.PREFIX)
-        return LogicalUnary(token.token_type, arg)
-
-    def parse_grouping(self, token):
-        expr = self.parse_expr()
-        if self.consume().token_type != TokenType.RPAREN:
-            raise ParseError(token.line, 'Missing \')\'.')
-        return Grouping(expr)
-
-    def parse_infix_operator(self, left, token, precedence, associativity):
-        precedence = precedence - (1 if associativity == Associativity.RIGHT else 0)
-        right = self.parse_expr(precedence)
-        return Binary(left, token.token_type, right)
-
-    def parse_infix_logical_operator(self, left, token, precedence, associativity):
-        precedence = precedence - (1 if associativity == Associativity.RIGHT else 0)
-        right = self.parse_expr(precedence)
-        return LogicalBinary(left, token.token_type, right)
+class LazyProgram(Program):
+    # The body of a function parsed with Parser(tokens, lazy=True). Only the tokens between its
+    # braces are kept, so the tokens of the rest of the program can be freed; the statements are
+    # parsed when they are first accessed, which the Interpreter does when the function is first
+    # called, and the tokens are dropped then. Syntax errors in the body are therefore reported
+    # then and not when the program is parsed.
+    __slots__ = ('tokens', 'parsed')
 
-    def parse_infix_string_operator(self, left, token, precedence, associativity):
-        precedence = precedence - (1 if associativity == Associativity.RIGHT else 0)
-        right = self.parse_expr(precedence)
-        return StringBinary(left, token.token_type, right)
+    def __new__(cls, tokens):
+        return object.__new__(cls)  # every lazy body is a node of its own
 
-    def parse_comparison(self, left, token, precedence, associativity):
-        precedence = precedence - (1 if associativity == Associativity.RIGHT else 0)
-        right = self.parse_expr(precedence)
-        return Comparison(left, token.token_type, right)
-
-    def parse_call(self, left, token, precedence, associativity):
-        args = []
-        if self.peek().token_type != TokenType.RPAREN:
-            while True:
-                arg = self.parse_expr()
-                args.append(arg)
-                if self.peek().token_type == TokenType.RPAREN: break
-                self.consume_token(TokenType.COMMA)
-        self.consume_token(TokenType.RPAREN)
-        return FunCall(left, args)
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.parsed = None
 
-class Precedences:
-    HASH = 1
-    OR = 2
-    AND = 3
-    EQUAL = 4
-    L = 5
-    PLUS = 6
-    MUL = 7
-    POW = 8
-    PREFIX = 9
-    CALL = 10
+    @property
+    def stmts(self):
+        if self.parsed is None:
+            parser = Parser(self.tokens, lazy=True)
+            stmts = parser.parse().stmts
+            if not parser.is_at_end():
+                raise ParseError(parser.peek().line, 'Expected {}.'.format(TokenType.RBRACE))
+            self.parsed = stmts
+            self.tokens = None
+        return self.parsed
 
-Associativity = Enum('Associativity', 'LEFT RIGHT')
+    @stmts.setter
+    def stmts(self, stmts):
+        self.parsed = stmts
+        self.tokens = None
 
 class ParseError(Exception):
     def __init__(self, line, msg):
@@ -1,9 +1,17 @@
-from function import Function
+from src.function import Function
 
 class PrintFunction(Function):
-    def __init__(self):
+    def __init__(self, out=None):
         super().__init__(None, None)
+        self.out = out  # a file to print to, sys.stdout at the time of the call if None
 
-    def call(self, interpreter, args):
-        value = args[0].accept(interpreter)
-        print(interpreter.to_string(value))
\ No newline at end of file
+    def invoke(self, interpreter, values):
+        print(to_string(values[0]), file=self.out)
+
+def to_string(value):
+    if value is False:
+        return 'false'
+    elif value is True:
+        return 'true'
+    else:
+        return str(value)
@@ -0,0 +1,164 @@
+from src.syntaxtree import *
+from src.resolver import assigned_names
+from src.function import Function, NO_RESULT
+from collections import OrderedDict
+
+MISSING = object()  # the value of a variable that is not defined
+
+def analyze(fun):
+    # Returns the free names of the body of 'fun', the names it assigns and the free names it
+    # calls if its calls could be memoized as far as the body alone tells, None otherwise: if it
+    # calls 'print', defines functions or calls something other than a free name. Whether the
+    # free names are bound to pure functions and whether the assignments create local variables
+    # is only known at run time, see Memo.
+    args = [arg.name for arg in fun.args]
+    assigned = tuple(name for name in assigned_names(fun.body) if name not in args)
+    reads = set()
+    callees = set()
+    if not collect(fun.body, reads, callees):
+        return None
+    free = reads.difference(args, assigned)
+    if 'print' in free or not callees <= free:
+        return None
+    return tuple(sorted(free)), assigned, frozenset(callees)
+
+def collect(node, reads, callees):
+    # Adds the names 'node' reads and calls, and returns False if it defines a function or calls
+    # the value of an expression.
+    if isinstance(node, Identifier):
+        reads.add(node.name)
+    elif isinstance(node, Fun):
+        return False
+    elif isinstance(node, Assign):
+        return collect(node.right, reads, callees)
+    elif isinstance(node, Program):
+        return all(collect(stmt, reads, callees) for stmt in node.stmts)
+    elif isinstance(node, FunCall):
+        callee = node.callee
+        while isinstance(callee, Grouping):
+            callee = callee.expr
+        if not isinstance(callee, Identifier):
+            return False
+        callees.add(callee.name)
+        reads.add(callee.name)
+        return all(collect(arg, reads, callees) for arg in node.args)
+    elif isinstance(node, If):
+        return all(collect(child, reads, callees) for child in (node.cond, node.left, node.right))
+    elif isinstance(node, While):
+        return collect(node.cond, reads, callees) and collect(node.body, reads, callees)
+    elif isinstance(node, (Binary, LogicalBinary, Comparison, StringBinary)):
+        return collect(node.left, reads, callees) and collect(node.right, reads, callees)
+    elif isinstance(node, (Unary, LogicalUnary, Grouping, ExprStmt, Ret)):
+        return collect(node.expr, reads, callees)
+    return True
+
+def lookup(env, name):
+    while env is not None:
+        if name in env.env:
+            return env.env[name]
+        env = env.parent
+    return MISSING
+
+class Memo:
+    # The results of the calls of a Function whose body passed analyze(), by the types and values
+    # of the arguments, the least recently used evicted beyond 'size' entries. A call only uses
+    # the memo if every function it can reach calls only such functions and assigns only local
+    # variables, i.e. the names it assigns are not defined in the environment it was defined in.
+    # This depends on the free variables of all these functions, which are recorded with their
+    # values in 'watched' and compared on every call; if one of them has changed, the memo is
+    # cleared, since the results might depend on it.
+    #
+    # Checking 'watched' and storing the results makes a call that misses slower than one without
+    # a memo, so a memo that has filled up with fewer than 'min_hit_rate' of its calls hitting is
+    # switched off: calls of functions whose arguments rarely repeat run as without it.
+    min_hit_rate = 0.1
+    def __init__(self, function, free, assigned, callees, size):
+        self.function = function
+        self.free = free
+        self.assigned = assigned
+        self.callees = callees
+        self.size = size
+        self.results = OrderedDict()
+        self.watched = None  # [(environment, name, value)]
+        self.pure = False
+        self.active = True  # False once the memo has been switched off
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, values):
+        # Returns the key of a call with the arguments 'values' and its result, NO_RESULT if it is
+        # not remembered; the key is None if the call cannot use the memo. Function.invoke makes
+        # the call and store()s its result, so a call takes no Python frame of its own here.
+        if not self.is_valid():
+            self.watch()
+        if not self.pure:
+            return None, NO_RESULT
+        # keeps 1, 1.0, true, 0.0 and -0.0 apart
+        key = tuple((type(value), repr(value) if type(value) is float else value) for value in values)
+        try:
+            result = self.results[key]
+        except KeyError:
+            self.misses += 1
+            return key, NO_RESULT
+        except TypeError:
+            return None, NO_RESULT  # an unhashable argument
+        self.results.move_to_end(key)
+        self.hits += 1
+        return key, result
+
+    def store(self, key, result):
+        if not self.active:
+            return  # switched off by a call made by this one
+        self.results[key] = result
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+            self.evictions += 1
+            if self.hits < self.min_hit_rate * (self.hits + self.misses):
+                self.active = False
+                self.results.clear()
+
+    def is_valid(self):
+        if self.watched is None:
+            return False
+        for env, name, value in self.watched:
+            if lookup(env, name) is not value:
+                return False
+        return True
+
+    def watch(self):
+        if self.results:
+            self.results.clear()
+            self.invalidations += 1
+        watched = []
+        pure = True
+        seen = set()
+        functions = [self.function]
+        while functions:
+            function = functions.pop()
+            if function in seen:
+                continue
+            seen.add(function)
+            memo = function.memo
+            env = function.env
+            for name in memo.free:
+                value = lookup(env, name)
+                watched.append((env, name, value))
+                if name in memo.callees:
+                    if type(value) is Function and value.memo is not None:
+                        functions.append(value)
+                    else:
+                        pure = False
+            for name in memo.assigned:
+                value = lookup(env, name)
+                watched.append((env, name, value))
+                if value is not MISSING:
+                    pure = False  # the assignment would change the enclosing variable
+        self.watched = watched
+        self.pure = pure
+
+    def __repr__(self):
+        return 'Memo({}: {} hits, {} misses, {} evictions, {} invalidations{})'.format(
+            self.function.fun.name.name, self.hits, self.misses, self.evictions, self.invalidations,
+            '' if self.active else ', switched off')
@@ -0,0 +1,97 @@
+from src.syntaxtree import *
+from src.mytoken import TokenType
+
+class PythonTranslator:
+    # Base of the visitors that turn SimpleLanguage into Python source. Statements are emitted
+    # as indented lines, expressions are returned as fully parenthesized strings, so Python's
+    # precedence rules and chained comparisons never change their meaning. 'assigned' tracks the
+    # variables that are certainly assigned at the current point of the translated code.
+    binary_operators = {
+        TokenType.PLUS: '+',
+        TokenType.MINUS: '-',
+        TokenType.MUL: '*',
+        TokenType.DIV: '/',
+        TokenType.POW: '**'
+    }
+
+    comparison_operators = {
+        TokenType.L: '<',
+        TokenType.LE: '<=',
+        TokenType.G: '>',
+        TokenType.GE: '>=',
+        TokenType.EQUAL: '=='
+    }
+
+    def __init__(self, indent=0):
+        self.lines = []
+        self.indent = indent
+        self.assigned = set()
+
+    def emit(self, line):
+        self.lines.append('    ' * self.indent + line)
+
+    def block(self, program):
+        length = len(self.lines)
+        for stmt in program.stmts:
+            stmt.accept(self)
+        if len(self.lines) == length:
+            self.emit('pass')
+
+    def nested_block(self, program):
+        self.indent += 1
+        self.block(program)
+        self.indent -= 1
+
+    def arguments(self, args):
+        return ', '.join(arg.accept(self) for arg in args)
+
+    def visit_program(self, program):
+        self.block(program)
+
+    def visit_if(self, if_stmt):
+        self.emit('if {}:'.format(if_stmt.cond.accept(self)))
+        assigned = self.assigned
+        self.assigned = set(assigned)
+        self.nested_block(if_stmt.left)
+        left = self.assigned
+        self.assigned = set(assigned)
+        if if_stmt.right.stmts:
+            self.emit('else:')
+            self.nested_block(if_stmt.right)
+        self.assigned = left & self.assigned
+
+    def visit_while(self, while_stmt):
+        self.emit('while {}:'.format(while_stmt.cond.accept(self)))
+        assigned = self.assigned
+        self.assigned = set(assigned)
+        self.nested_block(while_stmt.body)
+        self.assigned = assigned  # the body might not run at all
+
+    def visit_exprstmt(self, exprstmt):
+        self.emit(exprstmt.expr.accept(self))
+
+    def visit_binary(self, binary):
+        return '({} {} {})'.format(binary.left.accept(self), self.binary_operators[binary.op], binary.right.accept(self))
+
+    def visit_unary(self, unary):
+        expr = unary.expr.accept(self)
+        return '(-{})'.format(expr) if unary.op == TokenType.MINUS else expr
+
+    def visit_grouping(self, grouping):
+        return grouping.expr.accept(self)
+
+    def visit_literal(self, literal):
+        return repr(literal.value)
+
+    def visit_logicalbinary(self, logicalbinary):
+        op = 'or' if logicalbinary.op == TokenType.OR else 'and'
+        return '({} {} {})'.format(logicalbinary.left.accept(self), op, logicalbinary.right.accept(self))
+
+    def visit_logicalunary(self, logicalunary):
+        return '(not {})'.format(logicalunary.expr.accept(self))
+
+    def visit_comparison(self, comparison):
+        return '({} {} {})'.format(comparison.left.accept(self), self.comparison_operators[comparison.op], comparison.right.accept(self))
+
+    def visit_stringbinary(self, stringbinary):
+        return '(to_string({}) + to_string({}))'.format(stringbinary.left.accept(self), stringbinary.right.accept(self))
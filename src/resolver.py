@@ -0,0 +1,80 @@
+from src.syntaxtree import *
+
+UNASSIGNED = object()  # content of a frame slot whose variable has not been assigned yet
+
+class Scope:
+    def __init__(self, names):
+        self.names = names
+        self.slots = {name: i for i, name in enumerate(names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return 'Scope({})'.format(self.names)
+
+class Resolver:
+    # Decides statically where each variable of a function lives, so that compiled code can
+    # address it as (depth, slot): 'depth' counts the function scopes between the use and the
+    # declaring function, 'slot' indexes that function's frame. Names that resolve to no
+    # function scope are globals and keep their dictionary lookup.
+    #
+    # A name is local to a function if it is an argument of it, or if it is assigned or
+    # declared with 'fun' in its body and not already declared by an enclosing function or at
+    # the top level of the program. The tree-walker decides this at run time instead, so the two
+    # only differ if a function assigns a variable before the enclosing scope first does.
+    def __init__(self, global_names=()):
+        self.global_names = set(global_names)
+        self.scopes = []
+
+    def declare_globals(self, program):
+        self.global_names.update(assigned_names(program))
+
+    def begin_function(self, fun):
+        names = [arg.name for arg in fun.args]
+        for name in assigned_names(fun.body):
+            if name not in names and name not in self.global_names and self.resolve(name) is None:
+                names.append(name)
+        scope = Scope(names)
+        self.scopes.append(scope)
+        return scope
+
+    def end_function(self):
+        self.scopes.pop()
+
+    def in_function(self):
+        return len(self.scopes) > 0
+
+    def resolve(self, name):
+        for depth in range(len(self.scopes)):
+            slot = self.scopes[-1 - depth].slots.get(name)
+            if slot is not None:
+                return depth, slot
+        return None
+
+def assigned_names(program):
+    names = []
+    stack = list(reversed(program.stmts))
+    while stack:
+        stmt = stack.pop()
+        if isinstance(stmt, Assign):
+            name = stmt.left.name
+        elif isinstance(stmt, Fun):
+            name = stmt.name.name
+        elif isinstance(stmt, If):
+            stack.extend(reversed(stmt.right.stmts))
+            stack.extend(reversed(stmt.left.stmts))
+            continue
+        elif isinstance(stmt, While):
+            stack.extend(reversed(stmt.body.stmts))
+            continue
+        else:
+            continue
+        if name not in names:
+            names.append(name)
+    return names
+
+class UnassignedError(Exception):
+    def __init__(self, name):
+        self.name = name
+        self.msg = 'Variable {} used before assignment.'.format(name)
@@ -0,0 +1,325 @@
+from src.syntaxtree import *
+from src.token_buffer import token_types
+from src.lexer import Lexer
+from src.parser import Parser
+from array import array
+import hashlib
+import struct
+import gc
+import sys
+import os
+
+# Compiled-AST files: a parsed Program in a binary encoding, stored with the hash of the source
+# it was parsed from. The nodes are written in postfix order as one array of tags and one of
+# arguments, so loading is a single loop over both that builds each node from the ones before it
+# on a stack. Arguments are operator codes, numbers of children or indices into a table of the
+# literal values and names of the program.
+
+version = 1  # increase whenever the encoding, the syntax tree or the token types change
+magic = b'SIC\0'
+header = struct.Struct('<4sH32s7Q')
+
+BINARY, UNARY, GROUPING, LITERAL, IDENTIFIER, LOGICAL_BINARY, LOGICAL_UNARY, COMPARISON, \
+    STRING_BINARY, FUN_CALL, FUN, ASSIGN, EXPR_STMT, RET, IF, WHILE, PROGRAM = range(17)
+
+STR, INT, FLOAT, TRUE, FALSE, NONE, BIG_INT = range(7)
+
+class SicWriter:
+    def __init__(self):
+        self.tags = array('B')
+        self.args = array('I')
+        self.constants = {}  # (type, value) -> index in 'values'
+        self.values = []
+
+    def write(self, program, source_hash):
+        program.accept(self)
+        kinds = array('B')
+        lengths = array('I')
+        strings = []
+        ints = array('q')
+        floats = array('d')
+        for value in self.values:
+            if type(value) is str:
+                kinds.append(STR)
+                data = value.encode('utf-8')
+                lengths.append(len(data))
+                strings.append(data)
+            elif value is True:
+                kinds.append(TRUE)
+            elif value is False:
+                kinds.append(FALSE)
+            elif value is None:
+                kinds.append(NONE)
+            elif type(value) is float:
+                kinds.append(FLOAT)
+                floats.append(value)
+            elif -2 ** 63 <= value < 2 ** 63:
+                kinds.append(INT)
+                ints.append(value)
+            else:
+                kinds.append(BIG_INT)
+                data = str(value).encode('ascii')
+                lengths.append(len(data))
+                strings.append(data)
+        sections = [kinds, lengths, b''.join(strings), ints, floats, self.tags, self.args]
+        sections = [section if type(section) is bytes else little_endian(section) for section in sections]
+        return header.pack(magic, version, source_hash, *(len(section) for section in sections)) + b''.join(sections)
+
+    def emit(self, tag, arg=0):
+        self.tags.append(tag)
+        self.args.append(arg)
+
+    def constant(self, value):
+        key = (type(value), repr(value) if type(value) is float else value)  # keeps 1, 1.0, true, 0.0 and -0.0 apart
+        index = self.constants.get(key)
+        if index is None:
+            index = self.constants[key] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def visit_binary(self, binary):
+        self.write_binary(BINARY, binary)
+
+    def visit_unary(self, unary):
+        unary.expr.accept(self)
+        self.emit(UNARY, unary.op.value)
+
+    def visit_grouping(self, grouping):
+        grouping.expr.accept(self)
+        self.emit(GROUPING)
+
+    def visit_literal(self, literal):
+        self.emit(LITERAL, self.constant(literal.value))
+
+    def visit_identifier(self, identifier):
+        self.emit(IDENTIFIER, self.constant(identifier.name))
+
+    def visit_logicalbinary(self, logicalbinary):
+        self.write_binary(LOGICAL_BINARY, logicalbinary)
+
+    def visit_logicalunary(self, logicalunary):
+        logicalunary.expr.accept(self)
+        self.emit(LOGICAL_UNARY, logicalunary.op.value)
+
+    def visit_comparison(self, comparison):
+        self.write_binary(COMPARISON, comparison)
+
+    def visit_stringbinary(self, stringbinary):
+        self.write_binary(STRING_BINARY, stringbinary)
+
+    def write_binary(self, tag, node):
+        node.left.accept(self)
+        node.right.accept(self)
+        self.emit(tag, node.op.value)
+
+    def visit_funcall(self, funcall):
+        funcall.callee.accept(self)
+        for arg in funcall.args:
+            arg.accept(self)
+        self.emit(FUN_CALL, len(funcall.args))
+
+    def visit_fun(self, fun):
+        fun.name.accept(self)
+        for arg in fun.args:
+            arg.accept(self)
+        fun.body.accept(self)
+        self.emit(FUN, len(fun.args))
+
+    def visit_assign(self, assign_stmt):
+        assign_stmt.left.accept(self)
+        assign_stmt.right.accept(self)
+        self.emit(ASSIGN)
+
+    def visit_exprstmt(self, exprstmt):
+        exprstmt.expr.accept(self)
+        self.emit(EXPR_STMT)
+
+    def visit_ret(self, ret):
+        ret.expr.accept(self)
+        self.emit(RET)
+
+    def visit_if(self, if_stmt):
+        if_stmt.cond.accept(self)
+        if_stmt.left.accept(self)
+        if_stmt.right.accept(self)
+        self.emit(IF)
+
+    def visit_while(self, while_stmt):
+        while_stmt.cond.accept(self)
+        while_stmt.body.accept(self)
+        self.emit(WHILE)
+
+    def visit_program(self, program):
+        for stmt in program.stmts:
+            stmt.accept(self)
+        self.emit(PROGRAM, len(program.stmts))
+
+def little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def read_array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+def read_sic(data, source_hash):
+    # Returns the Program stored in 'data', or None if it was written for another source or
+    # another version. A corrupt file raises SicError, whatever part of it is damaged.
+    if len(data) < header.size:
+        return None
+    fields = header.unpack_from(data)
+    if fields[0] != magic or fields[1] != version or fields[2] != source_hash:
+        return None
+    try:
+        return read_body(data, fields)
+    except (IndexError, KeyError, ValueError, TypeError, struct.error) as error:
+        raise SicError('Truncated or corrupt compiled-AST file.') from error
+
+def read_body(data, fields):
+    sections = []
+    offset = header.size
+    for length in fields[3:]:
+        sections.append(data[offset:offset + length])
+        offset += length
+    if offset != len(data):
+        raise SicError('Truncated or corrupt compiled-AST file.')
+    kinds, lengths, strings, ints, floats, tags, args = sections
+    lengths = read_array('I', lengths)
+    ints = read_array('q', ints)
+    floats = read_array('d', floats)
+    constants = []
+    string_index = int_index = float_index = position = 0
+    for kind in kinds:
+        if kind == STR or kind == BIG_INT:
+            end = position + lengths[string_index]
+            text = strings[position:end].decode('utf-8')
+            constants.append(text if kind == STR else int(text))
+            string_index += 1
+            position = end
+        elif kind == INT:
+            constants.append(ints[int_index])
+            int_index += 1
+        elif kind == FLOAT:
+            constants.append(floats[float_index])
+            float_index += 1
+        else:
+            constants.append({TRUE: True, FALSE: False, NONE: None}[kind])
+    return build(tags, read_array('I', args), constants)
+
+def build(tags, args, constants):
+    # The tree has no reference cycles, so the collector is paused while it is built: otherwise
+    # it would traverse the growing tree over and over again, which takes most of the time.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return build_nodes(tags, args, constants)
+    finally:
+        if enabled:
+            gc.enable()
+
+def build_nodes(tags, args, constants):
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    for tag, arg in zip(tags, args):
+        if tag == IDENTIFIER:
+            push(Identifier(constants[arg]))
+        elif tag == LITERAL:
+            push(Literal(constants[arg]))
+        elif tag == BINARY:
+            right = pop()
+            stack[-1] = Binary(stack[-1], token_types[arg], right)
+        elif tag == COMPARISON:
+            right = pop()
+            stack[-1] = Comparison(stack[-1], token_types[arg], right)
+        elif tag == FUN_CALL:
+            start = len(stack) - arg
+            args_of_call = stack[start:]
+            del stack[start:]
+            stack[-1] = FunCall(stack[-1], args_of_call)
+        elif tag == ASSIGN:
+            right = pop()
+            stack[-1] = Assign(stack[-1], right)
+        elif tag == EXPR_STMT:
+            stack[-1] = ExprStmt(stack[-1])
+        elif tag == PROGRAM:
+            start = len(stack) - arg
+            stmts = stack[start:]
+            del stack[start:]
+            push(Program(stmts))
+        elif tag == RET:
+            stack[-1] = Ret(stack[-1])
+        elif tag == IF:
+            right = pop()
+            left = pop()
+            stack[-1] = If(stack[-1], left, right)
+        elif tag == WHILE:
+            body = pop()
+            stack[-1] = While(stack[-1], body)
+        elif tag == FUN:
+            body = pop()
+            start = len(stack) - arg
+            fun_args = stack[start:]
+            del stack[start:]
+            stack[-1] = Fun(stack[-1], fun_args, body)
+        elif tag == GROUPING:
+            stack[-1] = Grouping(stack[-1])
+        elif tag == UNARY:
+            stack[-1] = Unary(token_types[arg], stack[-1])
+        elif tag == LOGICAL_BINARY:
+            right = pop()
+            stack[-1] = LogicalBinary(stack[-1], token_types[arg], right)
+        elif tag == LOGICAL_UNARY:
+            stack[-1] = LogicalUnary(token_types[arg], stack[-1])
+        elif tag == STRING_BINARY:
+            right = pop()
+            stack[-1] = StringBinary(stack[-1], token_types[arg], right)
+        else:
+            raise SicError('Unknown node tag {}.'.format(tag))
+    if len(stack) != 1 or not isinstance(stack[0], Program):
+        raise SicError('Truncated or corrupt compiled-AST file.')
+    return stack[0]
+
+def cache_path(path, cache_dir=None):
+    # next to the source by default: program.si is cached in program.sic; in 'cache_dir' the name
+    # also has a hash of the absolute path, since sources in different directories share it
+    name = os.path.splitext(os.path.basename(path))[0]
+    if cache_dir is None:
+        return os.path.join(os.path.dirname(path), name + '.sic')
+    digest = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, '{}-{}.sic'.format(name, digest))
+
+def parse_cached(path, cache_dir=None):
+    # Parses the program at 'path', or loads it from its compiled-AST file if that was written
+    # for the same source and version; a missing or stale file is (re)written if possible.
+    with open(path, 'rb') as f:
+        source = f.read()
+    source_hash = hashlib.sha256(source).digest()
+    sic_path = cache_path(path, cache_dir)
+    try:
+        with open(sic_path, 'rb') as f:
+            program = read_sic(f.read(), source_hash)
+        if program is not None:
+            return program
+    except (OSError, SicError):
+        pass
+    program = Parser(Lexer(source.decode('utf-8')).lex()).parse()
+    try:
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        temporary = '{}.{}.tmp'.format(sic_path, os.getpid())
+        with open(temporary, 'wb') as f:
+            f.write(SicWriter().write(program, source_hash))
+        os.replace(temporary, sic_path)  # readers never see a partially written file
+    except OSError:
+        pass  # like a .pyc, the cache is only an optimization
+    return program
+
+class SicError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
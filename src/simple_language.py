@@ -1,12 +1,124 @@
 from src.interpreter import Interpreter
+from src.vm import VM
+from src.closure_compiler import ClosureInterpreter, ClosureCompiler
+from src.optimizer import Optimizer
+from src.transpiler import Transpiler
 from src.parser import Parser
 from src.lexer import Lexer
+from src.token_buffer import TokenStream
+from src.sic import parse_cached
+from src.environment import Environment
+from src.print_function import PrintFunction
+from io import StringIO
 
 class SimpleLanguage:
+    backends = {
+        'tree': Interpreter,
+        'vm': VM,
+        'closure': ClosureInterpreter
+    }
+
+    @staticmethod
+    def interpret_file(path, backend='tree', optimize=False, stream=False, cache=False, cache_dir=None, lazy=False):
+        # With 'cache' the parsed program is stored in a .sic file next to the source, or in
+        # 'cache_dir', and later runs load it from there until the source changes. With 'lazy'
+        # function bodies are only parsed when the function is first called.
+        if stream:
+            if backend != 'tree':
+                raise ValueError('Only the tree backend can interpret a stream of statements.')
+            with open(path) as f:
+                SimpleLanguage.interpret_stream(f, optimize)
+            return
+        if cache or cache_dir is not None:
+            ast = parse_cached(path, cache_dir)
+        else:
+            with open(path) as f:
+                program = f.read()
+            tokens = Lexer(program).lex()
+            ast = Parser(tokens, lazy).parse()
+        if optimize:
+            ast = Optimizer().optimize(ast)
+        SimpleLanguage.backends[backend]().interpret(ast)
+
+    @staticmethod
+    def interpret_stream(file, optimize=False):
+        # Every top-level statement is executed as soon as it has been parsed, and its tokens
+        # are dropped afterwards. Functions are never pruned by the optimizer here, since later
+        # statements might still call them.
+        tokens = TokenStream(Lexer('').lex_stream(file))
+        parser = Parser(tokens)
+        optimizer = Optimizer(prune_functions=False)
+
+        def statements():
+            for stmt in parser.statements():
+                tokens.release(parser.index)
+                yield optimizer.optimize(stmt) if optimize else stmt
+        Interpreter().interpret_stream(statements())
+
     @staticmethod
-    def interpret_file(path):
+    def compile_program(source, backend='tree', optimize=False, parse_cache=None):
+        # For running the same program many times, see CompiledProgram. With a ParseCache the
+        # program is only parsed if the cache does not hold it yet.
+        if parse_cache is None:
+            ast = Parser(Lexer(source).lex()).parse()
+        else:
+            ast = parse_cache.parse(source)
+        if optimize:
+            ast = Optimizer().optimize(ast)
+        return CompiledProgram(ast, backend)
+
+    @staticmethod
+    def compile_file(path, out, optimize=False):
         with open(path) as f:
             program = f.read()
         tokens = Lexer(program).lex()
         ast = Parser(tokens).parse()
-        Interpreter().interpret(ast)
\ No newline at end of file
+        if optimize:
+            ast = Optimizer().optimize(ast)
+        with open(out, 'w') as f:
+            f.write(Transpiler().transpile(ast, path))
+
+class CompiledProgram:
+    # A parsed program that can be run any number of times, each time with its own globals. The
+    # VM and the closure backend compile the program once for every set of names of globals it
+    # is run with, since the resolver needs to know which names are global; later runs with the
+    # same names only execute the compiled code.
+    def __init__(self, program, backend='tree'):
+        if backend not in SimpleLanguage.backends:
+            raise ValueError('Unknown backend {}.'.format(backend))
+        self.program = program
+        self.backend = backend
+        self.compiled = {}  # frozenset of the names of the globals -> compiled program
+
+    def run(self, bindings=None, out=None):
+        # Runs the program with the globals in the dict 'bindings', which is not modified, and
+        # returns the globals after the run. 'print' writes to 'out' if it is given.
+        variables = {} if bindings is None else dict(bindings)
+        if self.backend == 'tree':
+            interpreter = Interpreter(Environment(variables))
+            interpreter.globals['print'] = PrintFunction(out)
+            return interpreter.interpret(self.program)
+        compiled = self.compiled.get(frozenset(variables))
+        if compiled is None:
+            compiled = self.compiled[frozenset(variables)] = self.compile(variables)
+        if self.backend == 'vm':
+            vm = VM(Environment(variables))
+            vm.globals['print'] = PrintFunction(out)
+            vm.run(compiled, [], (), vm.globals)
+            return vm.globals
+        env = Environment(variables)
+        env['print'] = PrintFunction(out)
+        compiled([(env,)])
+        return env
+
+    def output(self, bindings=None):
+        # Runs the program and returns what it printed.
+        out = StringIO()
+        self.run(bindings, out)
+        return out.getvalue()
+
+    def compile(self, variables):
+        env = Environment(dict.fromkeys(variables))
+        if self.backend == 'vm':
+            return VM(env).compiler().compile(self.program)
+        return ClosureCompiler(ClosureInterpreter(env)).compile(self.program)
@@ -1,18 +1,33 @@
+from weakref import WeakValueDictionary
+from threading import Lock
+
+lock = Lock()  # taken to add a node, so that threads building equal nodes share one
+
 class Binary:
-	def __init__(self, left, op, right):
-		self.left = left
-		self.op = op
-		self.right = right
+	__slots__ = ('left', 'op', 'right', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, left, op, right):
+		key = (id(left), id(op), id(right))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.left = left
+					node.op = op
+					node.right = right
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return Binary, (self.left, self.op, self.right)
 
 	def accept(self, visitor):
 		return visitor.visit_binary(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, Binary): return False
-		elif self is other: return True
-		else:
-			return True and self.left == other.left and self.op == other.op and self.right == other.right
-
 	def __str__(self):
 		return 'Binary({}, {}, {})'.format(str(self.left), str(self.op), str(self.right))
 
@@ -20,19 +35,29 @@ class Binary:
 		return str(self)
 
 class Unary:
-	def __init__(self, op, expr):
-		self.op = op
-		self.expr = expr
+	__slots__ = ('op', 'expr', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, op, expr):
+		key = (id(op), id(expr))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.op = op
+					node.expr = expr
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return Unary, (self.op, self.expr)
 
 	def accept(self, visitor):
 		return visitor.visit_unary(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, Unary): return False
-		elif self is other: return True
-		else:
-			return True and self.op == other.op and self.expr == other.expr
-
 	def __str__(self):
 		return 'Unary({}, {})'.format(str(self.op), str(self.expr))
 
@@ -40,18 +65,28 @@ class Unary:
 		return str(self)
 
 class Grouping:
-	def __init__(self, expr):
-		self.expr = expr
+	__slots__ = ('expr', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, expr):
+		key = id(expr)
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.expr = expr
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return Grouping, (self.expr,)
 
 	def accept(self, visitor):
 		return visitor.visit_grouping(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, Grouping): return False
-		elif self is other: return True
-		else:
-			return True and self.expr == other.expr
-
 	def __str__(self):
 		return 'Grouping({})'.format(str(self.expr))
 
@@ -59,18 +94,28 @@ class Grouping:
 		return str(self)
 
 class Literal:
-	def __init__(self, value):
-		self.value = value
+	__slots__ = ('value', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, value):
+		key = (type(value), repr(value) if type(value) is float else value)
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.value = value
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return Literal, (self.value,)
 
 	def accept(self, visitor):
 		return visitor.visit_literal(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, Literal): return False
-		elif self is other: return True
-		else:
-			return True and self.value == other.value
-
 	def __str__(self):
 		return 'Literal({})'.format(str(self.value))
 
@@ -78,18 +123,28 @@ class Literal:
 		return str(self)
 
 class Identifier:
-	def __init__(self, name):
-		self.name = name
+	__slots__ = ('name', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, name):
+		key = (type(name), repr(name) if type(name) is float else name)
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.name = name
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return Identifier, (self.name,)
 
 	def accept(self, visitor):
 		return visitor.visit_identifier(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, Identifier): return False
-		elif self is other: return True
-		else:
-			return True and self.name == other.name
-
 	def __str__(self):
 		return 'Identifier(\'{}\')'.format(str(self.name))
 
@@ -97,20 +152,30 @@ class Identifier:
 		return str(self)
 
 class LogicalBinary:
-	def __init__(self, left, op, right):
-		self.left = left
-		self.op = op
-		self.right = right
+	__slots__ = ('left', 'op', 'right', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, left, op, right):
+		key = (id(left), id(op), id(right))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.left = left
+					node.op = op
+					node.right = right
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return LogicalBinary, (self.left, self.op, self.right)
 
 	def accept(self, visitor):
 		return visitor.visit_logicalbinary(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, LogicalBinary): return False
-		elif self is other: return True
-		else:
-			return True and self.left == other.left and self.op == other.op and self.right == other.right
-
 	def __str__(self):
 		return 'LogicalBinary({}, {}, {})'.format(str(self.left), str(self.op), str(self.right))
 
@@ -118,19 +183,29 @@ class LogicalBinary:
 		return str(self)
 
 class LogicalUnary:
-	def __init__(self, op, expr):
-		self.op = op
-		self.expr = expr
+	__slots__ = ('op', 'expr', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, op, expr):
+		key = (id(op), id(expr))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.op = op
+					node.expr = expr
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return LogicalUnary, (self.op, self.expr)
 
 	def accept(self, visitor):
 		return visitor.visit_logicalunary(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, LogicalUnary): return False
-		elif self is other: return True
-		else:
-			return True and self.op == other.op and self.expr == other.expr
-
 	def __str__(self):
 		return 'LogicalUnary({}, {})'.format(str(self.op), str(self.expr))
 
@@ -138,20 +213,30 @@ class LogicalUnary:
 		return str(self)
 
 class Comparison:
-	def __init__(self, left, op, right):
-		self.left = left
-		self.op = op
-		self.right = right
+	__slots__ = ('left', 'op', 'right', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, left, op, right):
+		key = (id(left), id(op), id(right))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.left = left
+					node.op = op
+					node.right = right
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return Comparison, (self.left, self.op, self.right)
 
 	def accept(self, visitor):
 		return visitor.visit_comparison(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, Comparison): return False
-		elif self is other: return True
-		else:
-			return True and self.left == other.left and self.op == other.op and self.right == other.right
-
 	def __str__(self):
 		return 'Comparison({}, {}, {})'.format(str(self.left), str(self.op), str(self.right))
 
@@ -159,20 +244,30 @@ class Comparison:
 		return str(self)
 
 class StringBinary:
-	def __init__(self, left, op, right):
-		self.left = left
-		self.op = op
-		self.right = right
+	__slots__ = ('left', 'op', 'right', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, left, op, right):
+		key = (id(left), id(op), id(right))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.left = left
+					node.op = op
+					node.right = right
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return StringBinary, (self.left, self.op, self.right)
 
 	def accept(self, visitor):
 		return visitor.visit_stringbinary(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, StringBinary): return False
-		elif self is other: return True
-		else:
-			return True and self.left == other.left and self.op == other.op and self.right == other.right
-
 	def __str__(self):
 		return 'StringBinary({}, {}, {})'.format(str(self.left), str(self.op), str(self.right))
 
@@ -180,19 +275,29 @@ class StringBinary:
 		return str(self)
 
 class FunCall:
-	def __init__(self, callee, args):
-		self.callee = callee
-		self.args = args
+	__slots__ = ('callee', 'args', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, callee, args):
+		key = (id(callee), tuple(map(id, args)))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.callee = callee
+					node.args = args
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return FunCall, (self.callee, self.args)
 
 	def accept(self, visitor):
 		return visitor.visit_funcall(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, FunCall): return False
-		elif self is other: return True
-		else:
-			return True and self.callee == other.callee and self.args == other.args
-
 	def __str__(self):
 		return 'FunCall({}, {})'.format(str(self.callee), str(self.args))
 
@@ -200,20 +305,30 @@ class FunCall:
 		return str(self)
 
 class Fun:
-	def __init__(self, name, args, body):
-		self.name = name
-		self.args = args
-		self.body = body
+	__slots__ = ('name', 'args', 'body', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, name, args, body):
+		key = (id(name), tuple(map(id, args)), id(body))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.name = name
+					node.args = args
+					node.body = body
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return Fun, (self.name, self.args, self.body)
 
 	def accept(self, visitor):
 		return visitor.visit_fun(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, Fun): return False
-		elif self is other: return True
-		else:
-			return True and self.name == other.name and self.args == other.args and self.body == other.body
-
 	def __str__(self):
 		return 'Fun({}, {}, {})'.format(str(self.name), str(self.args), str(self.body))
 
@@ -221,19 +336,29 @@ class Fun:
 		return str(self)
 
 class Assign:
-	def __init__(self, left, right):
-		self.left = left
-		self.right = right
+	__slots__ = ('left', 'right', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, left, right):
+		key = (id(left), id(right))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.left = left
+					node.right = right
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return Assign, (self.left, self.right)
 
 	def accept(self, visitor):
 		return visitor.visit_assign(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, Assign): return False
-		elif self is other: return True
-		else:
-			return True and self.left == other.left and self.right == other.right
-
 	def __str__(self):
 		return 'Assign({}, {})'.format(str(self.left), str(self.right))
 
@@ -241,18 +366,28 @@ class Assign:
 		return str(self)
 
 class ExprStmt:
-	def __init__(self, expr):
-		self.expr = expr
+	__slots__ = ('expr', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, expr):
+		key = id(expr)
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.expr = expr
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return ExprStmt, (self.expr,)
 
 	def accept(self, visitor):
 		return visitor.visit_exprstmt(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, ExprStmt): return False
-		elif self is other: return True
-		else:
-			return True and self.expr == other.expr
-
 	def __str__(self):
 		return 'ExprStmt({})'.format(str(self.expr))
 
@@ -260,18 +395,28 @@ class ExprStmt:
 		return str(self)
 
 class Ret:
-	def __init__(self, expr):
-		self.expr = expr
+	__slots__ = ('expr', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, expr):
+		key = id(expr)
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.expr = expr
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return Ret, (self.expr,)
 
 	def accept(self, visitor):
 		return visitor.visit_ret(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, Ret): return False
-		elif self is other: return True
-		else:
-			return True and self.expr == other.expr
-
 	def __str__(self):
 		return 'Ret({})'.format(str(self.expr))
 
@@ -279,20 +424,30 @@ class Ret:
 		return str(self)
 
 class If:
-	def __init__(self, cond, left, right):
-		self.cond = cond
-		self.left = left
-		self.right = right
+	__slots__ = ('cond', 'left', 'right', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, cond, left, right):
+		key = (id(cond), id(left), id(right))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.cond = cond
+					node.left = left
+					node.right = right
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return If, (self.cond, self.left, self.right)
 
 	def accept(self, visitor):
 		return visitor.visit_if(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, If): return False
-		elif self is other: return True
-		else:
-			return True and self.cond == other.cond and self.left == other.left and self.right == other.right
-
 	def __str__(self):
 		return 'If({}, {}, {})'.format(str(self.cond), str(self.left), str(self.right))
 
@@ -300,19 +455,29 @@ class If:
 		return str(self)
 
 class While:
-	def __init__(self, cond, body):
-		self.cond = cond
-		self.body = body
+	__slots__ = ('cond', 'body', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, cond, body):
+		key = (id(cond), id(body))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.cond = cond
+					node.body = body
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return While, (self.cond, self.body)
 
 	def accept(self, visitor):
 		return visitor.visit_while(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, While): return False
-		elif self is other: return True
-		else:
-			return True and self.cond == other.cond and self.body == other.body
-
 	def __str__(self):
 		return 'While({}, {})'.format(str(self.cond), str(self.body))
 
@@ -320,18 +485,28 @@ class While:
 		return str(self)
 
 class Program:
-	def __init__(self, stmts):
-		self.stmts = stmts
+	__slots__ = ('stmts', '__weakref__')
+
+	instances = WeakValueDictionary()
+
+	def __new__(cls, stmts):
+		key = tuple(map(id, stmts))
+		node = cls.instances.get(key)
+		if node is None:
+			with lock:
+				node = cls.instances.get(key)
+				if node is None:
+					node = object.__new__(cls)
+					node.stmts = stmts
+					cls.instances[key] = node
+		return node
+
+	def __reduce__(self):
+		return Program, (self.stmts,)
 
 	def accept(self, visitor):
 		return visitor.visit_program(self)
 
-	def __eq__(self, other):
-		if not isinstance(other, Program): return False
-		elif self is other: return True
-		else:
-			return True and self.stmts == other.stmts
-
 	def __str__(self):
 		return 'Program({})'.format(str(self.stmts))
 
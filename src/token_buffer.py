@@ -0,0 +1,105 @@
+from src.mytoken import MyToken, TokenType
+from array import array
+
+token_types = [None] + list(TokenType)  # indexed by the codes stored in a TokenBuffer, 0 for ':'
+
+class TokenBuffer:
+    # Stores tokens as parallel arrays of type codes, start and end offsets into the source and
+    # line numbers instead of one MyToken object each. The source may be a str, bytes or a
+    # memory-mapped file; indexing the buffer slices the text of a token out of it and returns
+    # an equal MyToken, so the Parser can consume a buffer just like a list of tokens.
+    def __init__(self, source):
+        self.source = source
+        self.types = array('B')
+        self.starts = array('Q')
+        self.ends = array('Q')
+        self.lines = array('I')
+        self.cached_index = None  # the parser looks at the same token several times in a row
+        self.cached_token = None
+
+    def append(self, code, start, end, line):
+        self.types.append(code)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        if index == self.cached_index:
+            return self.cached_token
+        token_type = token_types[self.types[index]]
+        if token_type == TokenType.EOL:
+            token = MyToken(token_type, None, None, self.lines[index])
+        else:
+            text = self.text(index)
+            if token_type == TokenType.NUMBER:
+                value = float(text) if '.' in text else int(text)
+            elif token_type == TokenType.IDENT or token_type == TokenType.STRING:
+                value = text
+            elif token_type == TokenType.TRUE:
+                value = True
+            elif token_type == TokenType.FALSE:
+                value = False
+            else:
+                value = None
+            token = MyToken(token_type, text, value, self.lines[index])
+        self.cached_index = index
+        self.cached_token = token
+        return token
+
+    def text(self, index):
+        text = self.source[self.starts[index]:self.ends[index]]
+        return text if type(text) is str else text.decode('utf-8')
+
+    def close(self):
+        close = getattr(self.source, 'close', None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return 'TokenBuffer({} tokens)'.format(len(self))
+
+class TokenStream:
+    # Gives the Parser indexed access to the tokens of an iterator. Only the tokens from the last
+    # release on are kept, so parsing a stream statement by statement holds the tokens of about
+    # one statement at a time.
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.window = []
+        self.offset = 0  # index of the first token in the window
+        self.seen = -1  # the highest index the parser has asked for
+        self.exhausted = False
+
+    def fill(self, length):
+        while not self.exhausted and self.offset + len(self.window) < length:
+            try:
+                self.window.append(next(self.tokens))
+            except StopIteration:
+                self.exhausted = True
+
+    def release(self, index):
+        del self.window[:index - self.offset]
+        self.offset = index
+
+    def __getitem__(self, index):
+        if index < self.offset:
+            raise IndexError('Token {} has already been released.'.format(index))
+        if index > self.seen:
+            self.seen = index
+        self.fill(index + 1)
+        return self.window[index - self.offset]
+
+    def __len__(self):
+        # Reads up to the token after the last one the parser has looked at, which is enough
+        # for its 'index >= len(tokens)' to tell whether the stream has ended, without waiting
+        # for more input than that.
+        self.fill(self.seen + 2)
+        return self.offset + len(self.window)
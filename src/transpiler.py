@@ -0,0 +1,106 @@
+from src.python_translator import PythonTranslator
+from src.resolver import Resolver, assigned_names
+from src.function import tail_call
+import keyword
+
+class Transpiler(PythonTranslator):
+    # Translates a whole program into the source of a Python module: top-level statements become
+    # module code and every 'fun' a def nested where the 'fun' is. Variables are scoped like in
+    # the compiled backends (see Resolver); a function assigning a variable of an enclosing
+    # function declares it nonlocal, one assigning a top-level variable declares it global.
+    # 'print' and 'to_string' are defined by the module itself, with the formatting of the
+    # interpreter; they reach Python's builtins through 'builtins', since the program's globals
+    # may shadow any of them, e.g. 'str := 1'.
+    #
+    # Like in the other backends, 'ret f(...)' in a function is a tail call: it returns a TailCall
+    # and the function is wrapped by 'trampoline', which makes the calls in a loop. Functions
+    # without tail calls are plain defs, so that other calls take a single Python frame.
+    reserved = {'builtins', 'to_string', 'TailCall', 'trampoline'}
+
+    def __init__(self, resolver=None):
+        super().__init__()
+        self.resolver = Resolver(['print']) if resolver is None else resolver
+
+    def transpile(self, program, source_name='<program>'):
+        self.resolver.declare_globals(program)
+        self.lines = ['# Generated from {} by SimpleLanguage.compile_file.'.format(source_name), 'import builtins', '']
+        self.lines.extend(['def to_string(value):',
+                           '    if value is False:',
+                           "        return 'false'",
+                           '    elif value is True:',
+                           "        return 'true'",
+                           '    else:',
+                           '        return builtins.str(value)',
+                           '',
+                           'def print(value):',
+                           '    builtins.print(to_string(value))',
+                           '',
+                           'class TailCall:',
+                           '    def __init__(self, function, args):',
+                           '        self.function = function',
+                           '        self.args = args',
+                           '',
+                           'def trampoline(body):',
+                           '    def function(*args):',
+                           '        result = body(*args)',
+                           '        while result.__class__ is TailCall:',
+                           '            callee = result.function',
+                           "            result = builtins.getattr(callee, 'body', callee)(*result.args)",
+                           '        return result',
+                           '    function.body = body',
+                           '    return function',
+                           ''])
+        self.tail_calls = []  # whether each function being translated has made a tail call
+        for stmt in program.stmts:
+            stmt.accept(self)
+        return '\n'.join(self.lines) + '\n'
+
+    def variable(self, name):
+        # Language names that Python or the generated code reserve get a trailing underscore,
+        # as do names already ending in one, so that no two names are mapped to the same one.
+        if keyword.iskeyword(name) or name in self.reserved or name.endswith('_'):
+            return name + '_'
+        return name
+
+    def visit_assign(self, assign_stmt):
+        self.emit('{} = {}'.format(self.variable(assign_stmt.left.name), assign_stmt.right.accept(self)))
+
+    def visit_fun(self, fun):
+        args = ', '.join(self.variable(arg.name) for arg in fun.args)
+        start = len(self.lines)
+        self.emit('def {}({}):'.format(self.variable(fun.name.name), args))
+        scope = self.resolver.begin_function(fun)
+        self.tail_calls.append(False)
+        self.indent += 1
+        try:
+            for name in assigned_names(fun.body):
+                if name in scope.slots:
+                    continue
+                declaration = 'global' if self.resolver.resolve(name) is None else 'nonlocal'
+                self.emit('{} {}'.format(declaration, self.variable(name)))
+            self.block(fun.body)
+        finally:
+            self.indent -= 1
+            self.resolver.end_function()
+        if self.tail_calls.pop():
+            self.lines.insert(start, '    ' * self.indent + '@trampoline')
+
+    def visit_funcall(self, funcall):
+        return '{}({})'.format(funcall.callee.accept(self), self.arguments(funcall.args))
+
+    def visit_ret(self, ret):
+        if not self.resolver.in_function():
+            raise TranspileError('A program can only be transpiled if it uses ret in functions.')
+        call = tail_call(ret)
+        if call is None:
+            self.emit('return {}'.format(ret.expr.accept(self)))
+        else:
+            self.emit('return TailCall({}, [{}])'.format(call.callee.accept(self), self.arguments(call.args)))
+            self.tail_calls[-1] = True
+
+    def visit_identifier(self, identifier):
+        return self.variable(identifier.name)
+
+class TranspileError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
@@ -0,0 +1,185 @@
+from src.mytoken import TokenType
+from src.interpreter import Interpreter, binary_functions, comparison_functions
+from src.environment import Environment
+from itertools import compress, repeat
+from operator import neg
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class VectorEvaluator:
+    # Evaluates an expression for every row of a table whose columns hold the values of its free
+    # identifiers. Arithmetic, comparisons and logical operators are applied to whole columns at
+    # once, as NumPy arrays if NumPy is installed and as lists otherwise; the right operand of
+    # 'and' and 'or' is only evaluated on the rows where the left one does not decide the result.
+    # Calls, '#' and the operations NumPy does not do like the interpreter, e.g. division by zero
+    # or arithmetic on strings, are evaluated row by row by the Interpreter instead. So is
+    # arithmetic on NumPy integers whose result might not fit into 64 bits, which would wrap
+    # around where the interpreter's integers grow.
+    def __init__(self, columns, interpreter=None):
+        if not columns:
+            raise ValueError('At least one column is needed.')
+        self.vectorized = numpy is not None
+        if self.vectorized:
+            columns = {name: self.array(column) for name, column in columns.items()}
+        else:
+            columns = {name: list(column) for name, column in columns.items()}
+        self.columns = columns
+        self.length = len(next(iter(columns.values())))
+        if any(len(column) != self.length for column in columns.values()):
+            raise ValueError('All columns must have the same length.')
+        self.interpreter = Interpreter() if interpreter is None else interpreter
+
+    def array(self, column):
+        column = numpy.asarray(column)
+        if column.dtype.kind == 'u' and column.size and column.max() >= 2 ** 63:
+            return column.astype(object)  # exact, like the interpreter's integers
+        if column.dtype.kind in 'iu':
+            return column.astype(numpy.int64)  # unsigned integers would wrap around below 0
+        return column
+
+    def evaluate(self, expr):
+        # Returns the column of the values of 'expr', one for each row.
+        result = expr.accept(self)
+        if self.is_column(result):
+            return result
+        if self.vectorized:
+            return self.column([result] * self.length)
+        return [result] * self.length
+
+    def is_column(self, value):
+        if self.vectorized:
+            return type(value) is numpy.ndarray
+        return type(value) is list
+
+    def select(self, rows):
+        # An evaluator for the rows whose entry in the boolean column 'rows' is true.
+        if self.vectorized:
+            columns = {name: column[rows] for name, column in self.columns.items()}
+        else:
+            columns = {name: list(compress(column, rows)) for name, column in self.columns.items()}
+        return VectorEvaluator(columns, self.interpreter)
+
+    def rows(self, node):
+        # Evaluates 'node' on each row with the interpreter, the columns being variables of an
+        # environment inside its globals.
+        names = list(self.columns)
+        columns = [column.tolist() if self.vectorized else column for column in self.columns.values()]
+        globals = self.interpreter.globals
+        result = [self.interpreter.execute(node, Environment(dict(zip(names, row)), globals))
+                  for row in zip(*columns)]
+        return self.column(result) if self.vectorized else result
+
+    def column(self, values):
+        # A NumPy array of Python values, of dtype object unless NumPy can hold them exactly.
+        column = numpy.array(values)
+        types = set(map(type, values))
+        if len(types) > 1 or (int in types and column.dtype.kind != 'i'):
+            return numpy.array(values, dtype=object)
+        return column
+
+    def apply(self, node, function, *operands):
+        if not any(self.is_column(operand) for operand in operands):
+            return function(*operands)
+        if not self.vectorized:
+            return list(map(function, *(operand if self.is_column(operand) else repeat(operand)
+                                        for operand in operands)))
+        try:
+            with numpy.errstate(divide='raise', over='raise', invalid='raise'):
+                return function(*operands)
+        except Exception:
+            return self.rows(node)
+
+    def arithmetic(self, node, function, *operands):
+        if self.vectorized:
+            # NumPy adds booleans with 'or', Python like the integers 0 and 1
+            operands = [operand.astype(numpy.int64) if self.is_column(operand) and operand.dtype == bool else operand
+                        for operand in operands]
+            result = self.apply(node, function, *operands)
+            if self.is_column(result) and result.dtype.kind == 'i' and self.might_overflow(function, operands):
+                return self.rows(node)
+            return result
+        return self.apply(node, function, *operands)
+
+    def might_overflow(self, function, operands):
+        # Whether the result of 'function' on integer operands might not be the exact one: the
+        # same operation on floats is accurate enough to tell whether it left the range of int64.
+        operands = [operand.astype(float) if self.is_column(operand) else float(operand) for operand in operands]
+        with numpy.errstate(all='ignore'):
+            approximation = function(*operands)
+        return not (numpy.abs(approximation) < 2.0 ** 62).all()
+
+    def visit_binary(self, binary):
+        left = binary.left.accept(self)
+        right = binary.right.accept(self)
+        return self.arithmetic(binary, binary_functions[binary.op], left, right)
+
+    def visit_unary(self, unary):
+        value = unary.expr.accept(self)
+        if unary.op == TokenType.PLUS:
+            return value
+        return self.arithmetic(unary, neg, value)
+
+    def visit_comparison(self, comparison):
+        left = comparison.left.accept(self)
+        right = comparison.right.accept(self)
+        return self.apply(comparison, comparison_functions[comparison.op], left, right)
+
+    def visit_logicalunary(self, logicalunary):
+        value = logicalunary.expr.accept(self)
+        if not self.is_column(value):
+            return not value
+        if not self.vectorized:
+            return [not element for element in value]
+        if value.dtype.kind not in 'biuf':
+            return self.rows(logicalunary)
+        return numpy.logical_not(value)
+
+    def visit_logicalbinary(self, logicalbinary):
+        left = logicalbinary.left.accept(self)
+        is_or = logicalbinary.op == TokenType.OR
+        if not self.is_column(left):
+            if bool(left) == is_or:
+                return left
+            return logicalbinary.right.accept(self)
+        if self.vectorized:
+            if left.dtype.kind not in 'biuf':
+                return self.rows(logicalbinary)
+            needed = left == 0 if is_or else left != 0  # the rows the left operand does not decide
+            if not needed.any():
+                return left
+            right = self.select(needed).evaluate(logicalbinary.right)
+            result = left.astype(left.dtype if right.dtype == left.dtype else object)
+            result[needed] = right
+            return result
+        needed = [not element if is_or else bool(element) for element in left]
+        if not any(needed):
+            return left
+        right = iter(self.select(needed).evaluate(logicalbinary.right))
+        return [next(right) if row_needed else element for element, row_needed in zip(left, needed)]
+
+    def visit_grouping(self, grouping):
+        return grouping.expr.accept(self)
+
+    def visit_literal(self, literal):
+        return literal.value
+
+    def visit_identifier(self, identifier):
+        column = self.columns.get(identifier.name)
+        if column is None:
+            return self.interpreter.globals[identifier.name]
+        return column
+
+    def visit_funcall(self, funcall):
+        return self.rows(funcall)
+
+    def visit_stringbinary(self, stringbinary):
+        return self.rows(stringbinary)
+
+def evaluate_columns(expr, columns, interpreter=None):
+    # Evaluates 'expr' once for every row of 'columns', a dict from the names of its free
+    # identifiers to NumPy arrays, array.arrays or lists of the same length. Other identifiers are
+    # looked up in the globals of 'interpreter', e.g. the functions of a program it has run.
+    return VectorEvaluator(columns, interpreter).evaluate(expr)
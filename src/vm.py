@@ -0,0 +1,229 @@
+from src.compiler import Compiler, OpCode
+from src.resolver import Resolver, UNASSIGNED, UnassignedError
+from src.environment import Environment
+from src.print_function import PrintFunction, to_string
+
+LOAD_CONST = OpCode.LOAD_CONST
+LOAD_GLOBAL = OpCode.LOAD_GLOBAL
+STORE_GLOBAL = OpCode.STORE_GLOBAL
+LOAD_LOCAL = OpCode.LOAD_LOCAL
+STORE_LOCAL = OpCode.STORE_LOCAL
+LOAD_DEREF = OpCode.LOAD_DEREF
+STORE_DEREF = OpCode.STORE_DEREF
+POP = OpCode.POP
+ADD = OpCode.ADD
+SUB = OpCode.SUB
+MUL = OpCode.MUL
+DIV = OpCode.DIV
+POW = OpCode.POW
+NEG = OpCode.NEG
+JUMP_IF_FALSE_OR_POP = OpCode.JUMP_IF_FALSE_OR_POP
+JUMP_IF_TRUE_OR_POP = OpCode.JUMP_IF_TRUE_OR_POP
+NOT = OpCode.NOT
+L = OpCode.L
+LE = OpCode.LE
+G = OpCode.G
+GE = OpCode.GE
+EQUAL = OpCode.EQUAL
+CONCAT = OpCode.CONCAT
+JUMP = OpCode.JUMP
+JUMP_IF_FALSE = OpCode.JUMP_IF_FALSE
+CALL = OpCode.CALL
+RET = OpCode.RET
+MAKE_FUNCTION = OpCode.MAKE_FUNCTION
+TAIL_CALL = OpCode.TAIL_CALL
+
+class Closure:
+    # 'frames' holds the frames of the enclosing function calls, innermost last, and 'env' the
+    # globals the function was defined in, which it uses wherever it is called from.
+    def __init__(self, code, frames, env):
+        self.code = code
+        self.frames = frames
+        self.env = env
+
+    def invoke(self, interpreter, values):
+        # called by the other backends and by VMs of other runs
+        vm = VM()
+        return vm.run(self.code, vm.new_frame(self.code, values), self.frames, self.env)
+
+    def __repr__(self):
+        return 'Closure({})'.format(self.code.name)
+
+class VM:
+    def __init__(self, env=None):
+        if env is None:
+            self.globals = Environment({})
+        else:
+            self.globals = env
+        self.globals['print'] = PrintFunction()
+
+    def interpret(self, program):
+        code = self.compiler().compile(program)
+        self.run(code, [], (), self.globals)
+        return self.globals
+
+    def interpret_expr(self, expr):
+        return self.run(self.compiler().compile_expr(expr), [], (), self.globals)
+
+    def compiler(self):
+        return Compiler(Resolver(self.globals.keys()))
+
+    def new_frame(self, code, args):
+        frame = args[:code.nargs]
+        frame.extend([UNASSIGNED] * (len(code.local_names) - len(frame)))
+        return frame
+
+    def to_string(self, value):
+        return to_string(value)
+
+    def run(self, code, frame, frames, env):
+        # Calls between closures do not recurse into run: the state of the caller is saved on
+        # 'calls' and restored by RET, so the recursion depth of a program is only bounded by
+        # the available memory. 'env' holds the globals of the code; a call switches to those
+        # of the called closure.
+        instructions = code.instructions
+        constants = code.constants
+        names = code.names
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        calls = []
+        pc = 0
+        while True:
+            op = instructions[pc]
+            arg = instructions[pc + 1]
+            pc += 2
+            if op == LOAD_LOCAL:
+                value = frame[arg]
+                if value is UNASSIGNED:
+                    raise UnassignedError(code.local_names[arg])
+                push(value)
+            elif op == LOAD_CONST:
+                push(constants[arg])
+            elif op == STORE_LOCAL:
+                frame[arg] = pop()
+            elif op == LOAD_DEREF:
+                value = frames[-(arg >> 16)][arg & 0xffff]
+                if value is UNASSIGNED:
+                    raise UnassignedError(code.deref_names[arg])
+                push(value)
+            elif op == STORE_DEREF:
+                frames[-(arg >> 16)][arg & 0xffff] = pop()
+            elif op == LOAD_GLOBAL:
+                push(env[names[arg]])
+            elif op == STORE_GLOBAL:
+                env[names[arg]] = pop()
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+            elif op == SUB:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif op == MUL:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif op == DIV:
+                right = pop()
+                stack[-1] = stack[-1] / right
+            elif op == L:
+                right = pop()
+                stack[-1] = stack[-1] < right
+            elif op == LE:
+                right = pop()
+                stack[-1] = stack[-1] <= right
+            elif op == G:
+                right = pop()
+                stack[-1] = stack[-1] > right
+            elif op == GE:
+                right = pop()
+                stack[-1] = stack[-1] >= right
+            elif op == EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] == right
+            elif op == CALL:
+                if arg:
+                    args = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    args = []
+                function = pop()
+                if not isinstance(function, Closure):
+                    push(function.invoke(self, args))
+                    continue
+                calls.append((code, pc, frame, frames, stack, env))
+                code = function.code
+                instructions = code.instructions
+                constants = code.constants
+                names = code.names
+                frame = self.new_frame(code, args)
+                frames = function.frames
+                env = function.env
+                stack = []
+                push = stack.append
+                pop = stack.pop
+                pc = 0
+            elif op == RET or op == TAIL_CALL and not isinstance(stack[-1 - arg], Closure):
+                if op == RET:
+                    value = pop()
+                else:
+                    args = stack[len(stack) - arg:]
+                    value = stack[-1 - arg].invoke(self, args)
+                if not calls:
+                    return value
+                code, pc, frame, frames, stack, env = calls.pop()
+                instructions = code.instructions
+                constants = code.constants
+                names = code.names
+                push = stack.append
+                pop = stack.pop
+                push(value)
+            elif op == TAIL_CALL:
+                if arg:
+                    args = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    args = []
+                function = pop()
+                code = function.code
+                instructions = code.instructions
+                constants = code.constants
+                names = code.names
+                frame = self.new_frame(code, args)
+                frames = function.frames
+                env = function.env
+                pc = 0
+            elif op == POP:
+                pop()
+            elif op == POW:
+                right = pop()
+                stack[-1] = stack[-1] ** right
+            elif op == NEG:
+                stack[-1] = -stack[-1]
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if stack[-1]:
+                    pop()
+                else:
+                    pc = arg
+            elif op == JUMP_IF_TRUE_OR_POP:
+                if stack[-1]:
+                    pc = arg
+                else:
+                    pop()
+            elif op == NOT:
+                stack[-1] = not stack[-1]
+            elif op == CONCAT:
+                right = pop()
+                stack[-1] = to_string(stack[-1]) + to_string(right)
+            elif op == MAKE_FUNCTION:
+                push(Closure(constants[arg], frames + (frame,), env))
+            else:
+                raise VMError('Unknown opcode {}.'.format(op))
+
+class VMError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
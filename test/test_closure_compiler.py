@@ -0,0 +1,19 @@
+from src.closure_compiler import ClosureInterpreter
+from src.interpreter import Interpreter
+import test.test_interpreter as base
+from test.test_vm import run
+from unittest import TestCase
+import os
+
+class TestClosureInterpreter(base.TestInterpreter):
+    interpreter = ClosureInterpreter
+
+class TestClosureProgram(TestCase):
+    def test_example(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            source = f.read()
+        self.assertEqual(run(Interpreter(), source), run(ClosureInterpreter(), source))
+
+    def test_ret_from_loop(self):
+        source = 'fun f(n) {\ni := 0\nwhile true {\nif i = n {\nret i * 2\n}\ni := i + 1\n}\n}\nprint(f(4))\nprint(f(0))'
+        self.assertEqual('8\n0\n', run(ClosureInterpreter(), source))
@@ -0,0 +1,60 @@
+from unittest import TestCase
+from src.simple_language import SimpleLanguage, CompiledProgram
+from src.interpreter import Interpreter
+from src.function import Function
+from src.parser import Parser
+from src.lexer import Lexer
+from test.test_vm import run
+import os
+
+class TestCompiledProgram(TestCase):
+    backends = ['tree', 'vm', 'closure']
+
+    def test_example(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            source = f.read()
+        expected = run(Interpreter(), source)
+        for backend in self.backends:
+            program = SimpleLanguage.compile_program(source, backend)
+            self.assertEqual(expected, program.output())
+            self.assertEqual(expected, program.output())
+
+    def test_bindings(self):
+        source = 'fun scale(n) {\nret n * factor\n}\ny := scale(x)\nprint(y)'
+        for backend in self.backends:
+            program = SimpleLanguage.compile_program(source, backend)
+            bindings = {'x': 2, 'factor': 3}
+            self.assertEqual(6, program.run(bindings)['y'])
+            self.assertEqual({'x': 2, 'factor': 3}, bindings)
+            self.assertEqual('7.5\n', program.output({'x': 2.5, 'factor': 3}))
+            self.assertEqual('x\n', program.output({'x': 'x', 'factor': 1, 'unused': 0}))
+            with self.assertRaises(TypeError):  # 'factor' is None
+                program.run({'x': 2})
+            self.assertEqual('-2\n', program.output({'x': -1, 'factor': 2}))
+
+    def test_separate_runs(self):
+        class Nested(Function):
+            # runs the program again from within a run
+            def invoke(self, interpreter, values):
+                return program.run({'x': values[0], 'f': self})['z']
+        source = 'y := x\nif x > 0 {\ny := f(x - 1)\n}\nz := x\nfun get() {\nret x\n}'
+        for backend in self.backends:
+            program = SimpleLanguage.compile_program(source, backend)
+            env = program.run({'x': 2, 'f': Nested(None, None)})
+            self.assertEqual((1, 2), (env['y'], env['z']))
+            program.run({'x': 3, 'f': Nested(None, None)})
+            for other in [backend, 'tree']:
+                call = SimpleLanguage.compile_program('x := 99\nprint(get())', other)
+                self.assertEqual('2\n', call.output({'get': env['get']}))
+
+    def test_compiled_once(self):
+        program = SimpleLanguage.compile_program('y := x + 1', 'vm')
+        for x in range(3):
+            self.assertEqual(x + 1, program.run({'x': x})['y'])
+        self.assertEqual(1, len(program.compiled))
+        program.run({'x': 0, 'z': 0})
+        self.assertEqual(2, len(program.compiled))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            CompiledProgram(Parser(Lexer('x := 1').lex()).parse(), 'jvm')
@@ -0,0 +1,71 @@
+from unittest import TestCase, mock
+from src.incremental import Document
+from src.lexer import Lexer
+from src.parser import Parser, ParseError
+import src.incremental
+
+class CountingParser(Parser):
+    parsed = []
+
+    def statements(self):
+        for stmt in super().statements():
+            CountingParser.parsed.append(stmt)
+            yield stmt
+
+def check(test, document):
+    tokens = Lexer(document.source).lex()
+    test.assertEqual(tokens, document.tokens)
+    test.assertIs(Parser(tokens).parse(), document.program)
+
+class TestIncremental(TestCase):
+    def setUp(self):
+        self.source = ''.join('fun f{0}(a) {{\nret a * {0}\n}}\nx := f{0}(2)\n'.format(i) for i in range(50))
+
+    def edit(self, document, offset, removed, inserted):
+        CountingParser.parsed = []
+        with mock.patch.object(src.incremental, 'Parser', CountingParser):
+            document.edit(offset, removed, inserted)
+        check(self, document)
+        return CountingParser.parsed
+
+    def test_reparse_statement(self):
+        document = Document(self.source)
+        check(self, document)
+        last = document.tokens[-1]
+        offset = self.source.index('ret a * 20') + 9
+        parsed = self.edit(document, offset, 1, '7 + 1')
+        self.assertIn('ret a * 27 + 1\n', document.source)
+        self.assertEqual(1, len(parsed))  # only the function
+        self.assertIs(last, document.tokens[-1])
+
+    def test_lines(self):
+        document = Document(self.source)
+        self.edit(document, self.source.index('fun f10'), 0, 'y := 1\n\n')
+        self.edit(document, self.source.index('fun f10'), 8, '')
+        self.edit(document, 0, 0, '\n')
+        self.edit(document, len(document.source), 0, 'z := x')
+        self.edit(document, 0, len(document.source), '')
+
+    def test_old_tokens(self):
+        document = Document(self.source)
+        tokens = document.tokens
+        lines = [token.line for token in tokens]
+        self.edit(document, 0, 0, '\n\n')
+        self.assertEqual(lines, [token.line for token in tokens])
+        self.assertEqual(lines[-1] + 2, document.tokens[-1].line)
+
+    def test_strings(self):
+        document = Document(self.source)
+        self.edit(document, self.source.index('x := f30'), 0, 's := \'')  # a string to the end of the source
+        self.edit(document, document.source.index('x := f40'), 0, '\'\n')
+        self.edit(document, document.source.index('s := \''), 6, '')
+
+    def test_errors(self):
+        document = Document(self.source)
+        with self.assertRaises(ParseError) as error:
+            document.edit(self.source.index('x := f20'), 0, 'y := )\n\n')
+        self.assertEqual(84, error.exception.line)
+        check(self, document)
+        self.assertEqual(self.source, document.source)
+        with self.assertRaises(ValueError):
+            document.edit(len(self.source), 1, '')
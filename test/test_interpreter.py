@@ -8,6 +8,8 @@ import sys
 from io import StringIO
 
 class TestInterpreter(TestCase):
+    interpreter = Interpreter
+
     def test_arithmetic(self):
         # 5 * 2 + 3 * 8 ^ 2 * 2 - (10 / 5 - 2)
         tree = \
@@ -46,7 +48,7 @@ class TestInterpreter(TestCase):
                     )
                 )
             )
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         self.assertEqual(394, interpreter.interpret_expr(tree))
 
     def test_identifiers(self):
@@ -72,7 +74,7 @@ class TestInterpreter(TestCase):
                 )
             )
         env = {'x': -1, 'test123': 7, 'asd': -3}
-        interpreter = Interpreter(env)
+        interpreter = self.interpreter(env)
         self.assertAlmostEqual(71.6, interpreter.interpret_expr(tree))
 
     def test_booleans(self):
@@ -93,7 +95,7 @@ class TestInterpreter(TestCase):
                     Literal(False)
                 )
             )
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         self.assertEqual(True, interpreter.interpret_expr(tree))
 
         # 5 <= 3 = 7 > 5 - 2
@@ -115,7 +117,7 @@ class TestInterpreter(TestCase):
                     )
                 )
             )
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         self.assertEqual(False, interpreter.interpret_expr(tree))
 
     def test_strings(self):
@@ -136,7 +138,7 @@ class TestInterpreter(TestCase):
                 TokenType.HASH,
                 Literal('')
             )
-        interpreter = Interpreter(Environment({'x': 'hello'}))
+        interpreter = self.interpreter(Environment({'x': 'hello'}))
         self.assertEqual('hellotest123', interpreter.interpret_expr(tree))
 
         # 'asd' # 5 + 3 # true and false # x
@@ -162,13 +164,13 @@ class TestInterpreter(TestCase):
                 TokenType.HASH,
                 Identifier('x')
             )
-        interpreter = Interpreter(Environment({'x': 'hello'}))
+        interpreter = self.interpreter(Environment({'x': 'hello'}))
         self.assertEqual('asd8falsehello', interpreter.interpret_expr(tree))
 
         # 1.2
         tree = \
             StringBinary(Literal(1), TokenType.HASH, Literal(2))
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         self.assertEqual('12', interpreter.interpret_expr(tree))
 
     def test_assignment(self):
@@ -176,7 +178,7 @@ class TestInterpreter(TestCase):
             Program([Assign(Identifier('x'), Literal(5.2)),
                      Assign(Identifier('y'), LogicalBinary(LogicalUnary(TokenType.NOT, Literal(True)), TokenType.OR, Literal(True))),
                      Assign(Identifier('z'), StringBinary(Literal('asd'), TokenType.HASH, Identifier('y')))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertAlmostEqual(5.2, env['x'])
         self.assertEqual(True, env['y'])
@@ -188,7 +190,7 @@ class TestInterpreter(TestCase):
                 LogicalBinary(Identifier('y'), TokenType.AND, Literal(False))])),
                      ExprStmt(FunCall(Identifier('print'), [Literal('asd')]))])
         env = {'x': 5, 'y': True}
-        interpreter = Interpreter(env)
+        interpreter = self.interpreter(env)
         saved_stdout = sys.stdout
         try:
             out = StringIO()
@@ -204,14 +206,14 @@ class TestInterpreter(TestCase):
         tree = \
             Program([Assign(Identifier('x'), Literal(0)), If(Comparison(Literal(2), TokenType.L, Literal(3)),
                                                     Program([Assign(Identifier('x'), Literal(5))]), Program([]))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         self.assertEqual(5, interpreter.interpret(tree)['x'])
 
         # x := 0\nif 2 > 3 {x := 5}
         tree = \
             Program([Assign(Identifier('x'), Literal(0)), If(Comparison(Literal(3), TokenType.L, Literal(2)),
                                                     Program([Assign(Identifier('x'), Literal(5))]), Program([]))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         self.assertEqual(0, interpreter.interpret(tree)['x'])
 
         # x := 0\nwhile x < 10 {x := x + 1}\nb := x = 10
@@ -219,7 +221,7 @@ class TestInterpreter(TestCase):
             Program([Assign(Identifier('x'), Literal(0)), While(Comparison(Identifier('x'), TokenType.L, Literal(10)),
                                                        Program([Assign(Identifier('x'), Binary(Identifier('x'), TokenType.PLUS, Literal(1)))])),
                      Assign(Identifier('b'), Comparison(Identifier('x'), TokenType.EQUAL, Literal(10)))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertEqual(10, env['x'])
         self.assertEqual(True, env['b'])
@@ -231,7 +233,7 @@ class TestInterpreter(TestCase):
                 Assign(Identifier('y'), Literal(1)),
                 Ret(Binary(Identifier('x'), TokenType.POW, Literal(2))), Ret(Identifier('x'))])),
             Assign(Identifier('x'), FunCall(Identifier('f'), [Binary(Identifier('x'), TokenType.PLUS, Literal(1))]))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertEqual(9, env['x'])
         self.assertEqual(9, env['f'].env['x'])
@@ -243,7 +245,7 @@ class TestInterpreter(TestCase):
                      Fun(Identifier('f'), [], Program([Ret(Identifier('x'))])),
                      Assign(Identifier('x'), Literal(2)),
                      Assign(Identifier('y'), FunCall(Identifier('f'), []))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertEqual(2, env['y'])
 
@@ -252,7 +254,7 @@ class TestInterpreter(TestCase):
             Program([Assign(Identifier('x'), Literal(1)), Fun(Identifier('f'), [], Program([
                 Assign(Identifier('x'), Literal(2))
             ])),ExprStmt(FunCall(Identifier('f'), []))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertEqual(2, env['x'])
 
@@ -267,7 +269,7 @@ class TestInterpreter(TestCase):
                                          Assign(Identifier('a'), Literal('inner')),
                                          Assign(Identifier('b2'), FunCall(Identifier('showA'), []))])),
                      ExprStmt(FunCall(Identifier('outer'), []))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertEqual('global', env['b1'])
         self.assertEqual('inner', env['b2'])
@@ -278,7 +280,7 @@ class TestInterpreter(TestCase):
                 [ExprStmt(FunCall(Identifier('print'), [Identifier('a')])), Assign(Identifier('a'), Literal(10))])),
                      Assign(Identifier('a'), Literal(20)), ExprStmt(FunCall(Identifier('f'), [])),
                      ExprStmt(FunCall(Identifier('print'), [Identifier('a')]))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         saved_stdout = sys.stdout
         try:
             out = StringIO()
@@ -294,7 +296,7 @@ class TestInterpreter(TestCase):
             Program([Fun(Identifier('f'), [Identifier('x')], Program([
                 Assign(Identifier('x'), Literal(10)), Ret(Identifier('x'))
             ])), Assign(Identifier('x'), Literal(5)), Assign(Identifier('y'), FunCall(Identifier('f'), [Identifier('x')]))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertEqual(5, env['x'])
         self.assertEqual(10, env['y'])
@@ -313,7 +315,7 @@ class TestInterpreter(TestCase):
                 ])),
                 Assign(Identifier('x'), FunCall(Identifier('f'), [Literal(5), Literal(0)]))
             ])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         self.assertEqual(5, interpreter.interpret(tree)['x'])
 
         # fun odd(n) {
@@ -353,7 +355,7 @@ class TestInterpreter(TestCase):
                 Assign(Identifier('c'), FunCall(Identifier('even'), [Literal(10)])),
                 Assign(Identifier('d'), FunCall(Identifier('odd'), [Literal(10)]))
             ])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertEqual(False, env['a'])
         self.assertEqual(True, env['b'])
@@ -368,7 +370,7 @@ class TestInterpreter(TestCase):
                      Fun(Identifier('g'), [Identifier('x')],
                          Program([Ret(Binary(Identifier('x'), TokenType.PLUS, Literal(1)))])),
                      Assign(Identifier('y'), FunCall(Identifier('f'), [Identifier('g'), Literal(3)]))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         self.assertEqual(5, interpreter.interpret(tree)['y'])
 
         # fun f() {fun g() {ret 1}\nret g}\nx := f()()
@@ -376,7 +378,7 @@ class TestInterpreter(TestCase):
             Program([Fun(Identifier('f'), [],
                          Program([Fun(Identifier('g'), [], Program([Ret(Literal(1))])), Ret(Identifier('g'))])),
                      Assign(Identifier('x'), FunCall(FunCall(Identifier('f'), []), []))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertEqual(1, env['x'])
         self.assertFalse('g' in env)
@@ -393,7 +395,7 @@ class TestInterpreter(TestCase):
                      Assign(Identifier('d'), FunCall(Identifier('double'), [Identifier('g')])),
                      Assign(Identifier('a'), FunCall(Identifier('d'), [Literal(3)])),
                      Assign(Identifier('b'), FunCall(Identifier('d'), [Literal(5)]))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertEqual(5, env['a'])
         self.assertEqual(7, env['b'])
@@ -410,7 +412,7 @@ class TestInterpreter(TestCase):
                      Assign(Identifier('c'), FunCall(Identifier('counter'), [])),
                      Assign(Identifier('a'), FunCall(Identifier('c'), [])),
                      Assign(Identifier('b'), FunCall(Identifier('c'), []))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         env = interpreter.interpret(tree)
         self.assertEqual(1, env['a'])
         self.assertEqual(2, env['b'])
@@ -420,7 +422,7 @@ class TestInterpreter(TestCase):
         tree = \
             Program([Fun(Identifier('f'), [], Program([ExprStmt(FunCall(Identifier('print'), [Literal(5)]))])),
                      ExprStmt(Binary(Literal(10), TokenType.PLUS, Literal(4))), ExprStmt(FunCall(Identifier('f'), []))])
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
         saved_stdout = sys.stdout
         try:
             out = StringIO()
@@ -431,3 +433,69 @@ class TestInterpreter(TestCase):
         finally:
             sys.stdout = saved_stdout
 
+    def test_tail_calls(self):
+        # fun count(n, acc) {if n = 0 {ret acc}\nret (count(n - 1, acc + 1))}\nx := count(5000, 0)
+        tree = \
+            Program([
+                Fun(Identifier('count'), [Identifier('n'), Identifier('acc')], Program([
+                    If(Comparison(Identifier('n'), TokenType.EQUAL, Literal(0)),
+                       Program([Ret(Identifier('acc'))]),
+                       Program([])),
+                    Ret(Grouping(FunCall(Identifier('count'), [Binary(Identifier('n'), TokenType.MINUS, Literal(1)),
+                                                               Binary(Identifier('acc'), TokenType.PLUS, Literal(1))])))
+                ])),
+                Assign(Identifier('x'), FunCall(Identifier('count'), [Literal(5000), Literal(0)]))
+            ])
+        interpreter = self.interpreter()
+        self.assertEqual(5000, interpreter.interpret(tree)['x'])
+
+        # fun f(x) {ret print(x)}\ny := f(3)
+        tree = \
+            Program([Fun(Identifier('f'), [Identifier('x')], Program([Ret(FunCall(Identifier('print'), [Identifier('x')]))])),
+                     Assign(Identifier('y'), FunCall(Identifier('f'), [Literal(3)]))])
+        interpreter = self.interpreter()
+        saved_stdout = sys.stdout
+        try:
+            out = StringIO()
+            sys.stdout = out
+            env = interpreter.interpret(tree)
+            self.assertEqual('3', out.getvalue().strip())
+            self.assertIsNone(env['y'])
+        finally:
+            sys.stdout = saved_stdout
+
+    def test_ret_from_loop(self):
+        # fun f(n) {while true {if n > 3 {ret n}\nn := n + 1}}\nx := f(0)\nret 5\nx := 1
+        tree = \
+            Program([Fun(Identifier('f'), [Identifier('n')], Program([
+                While(Literal(True), Program([
+                    If(Comparison(Identifier('n'), TokenType.G, Literal(3)), Program([Ret(Identifier('n'))]), Program([])),
+                    Assign(Identifier('n'), Binary(Identifier('n'), TokenType.PLUS, Literal(1)))]))])),
+                Assign(Identifier('x'), FunCall(Identifier('f'), [Literal(0)])),
+                Ret(Literal(5)),
+                Assign(Identifier('x'), Literal(1))])
+        interpreter = self.interpreter()
+        self.assertEqual(4, interpreter.interpret(tree)['x'])
+
+    def test_short_circuit(self):
+        # fun boom() {print('boom')\nret true}\na := false and boom()\nb := true or boom()\nc := true and boom()\nd := 0 or 'x'
+        tree = \
+            Program([Fun(Identifier('boom'), [], Program([ExprStmt(FunCall(Identifier('print'), [Literal('boom')])),
+                                                        Ret(Literal(True))])),
+                     Assign(Identifier('a'), LogicalBinary(Literal(False), TokenType.AND, FunCall(Identifier('boom'), []))),
+                     Assign(Identifier('b'), LogicalBinary(Literal(True), TokenType.OR, FunCall(Identifier('boom'), []))),
+                     Assign(Identifier('c'), LogicalBinary(Literal(True), TokenType.AND, FunCall(Identifier('boom'), []))),
+                     Assign(Identifier('d'), LogicalBinary(Literal(0), TokenType.OR, Literal('x')))])
+        interpreter = self.interpreter()
+        saved_stdout = sys.stdout
+        try:
+            out = StringIO()
+            sys.stdout = out
+            env = interpreter.interpret(tree)
+            self.assertEqual('boom', out.getvalue().strip())
+        finally:
+            sys.stdout = saved_stdout
+        self.assertEqual(False, env['a'])
+        self.assertEqual(True, env['b'])
+        self.assertEqual(True, env['c'])
+        self.assertEqual('x', env['d'])
@@ -0,0 +1,64 @@
+from src.interpreter import Interpreter
+from src.environment import Environment
+from src.lexer import Lexer
+from src.parser import Parser
+import test.test_interpreter as base
+from test.test_vm import run
+from unittest import TestCase
+import os
+
+class EagerInterpreter(Interpreter):
+    # compiles every function on its first call
+    def __init__(self, env=None):
+        super().__init__(env, jit_threshold=1)
+
+def parse(source):
+    return Parser(Lexer(source).lex()).parse()
+
+class TestJITInterpreter(base.TestInterpreter):
+    interpreter = EagerInterpreter
+
+class TestJIT(TestCase):
+    def test_example(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            source = f.read()
+        self.assertEqual(run(Interpreter(jit_threshold=None), source), run(EagerInterpreter(), source))
+
+    def test_threshold(self):
+        program = parse('fun f(x) {\nret x * 2\n}\nfun g() {\nfun h() {\n}\n}\ni := 0\nwhile i < 10 {\ny := f(i)\ng()\ni := i + 1\n}')
+        interpreter = Interpreter(jit_threshold=5)
+        env = interpreter.interpret(program)
+        self.assertEqual(18, env['y'])
+        self.assertEqual({(): env['f'].compiled}, interpreter.jit.code[env['f'].fun])
+        self.assertEqual({('h',): None}, interpreter.jit.code[env['g'].fun])  # g defines a function
+        self.assertIsNotNone(env['f'].compiled)
+        self.assertEqual(5, env['f'].calls)
+        self.assertIsNone(env['g'].compiled)
+        self.assertEqual(10, env['g'].calls)
+
+    def test_closures(self):
+        source = ('fun make(k) {\nfun add(x) {\ny := x + k\nret y\n}\nret add\n}\n'
+                  'a := make(1)\nb := make(2)\np := a(1) + a(1) + b(1) + b(1)\n'
+                  'y := 0\nc := make(3)\nq := c(1) + c(1)')
+        interpreter = Interpreter(jit_threshold=2)
+        env = interpreter.interpret(parse(source))
+        self.assertEqual((10, 8, 4), (env['p'], env['q'], env['y']))
+        self.assertIsNotNone(env['a'].compiled)
+        self.assertIs(env['a'].compiled, env['b'].compiled)  # translated once
+        self.assertIsNot(env['a'].compiled, env['c'].compiled)  # y is global when c is compiled
+        self.assertEqual(2, len(interpreter.jit.code[env['a'].fun]))
+
+    def test_outer_variables(self):
+        source = 'total := 0\nfun add(x) {\ntotal := total + x\nlast := x\n}\nadd(1)\nadd(2)\nprint(total)\nlast := 0\nadd(3)\nprint(total # last)'
+        self.assertEqual('3\n63\n', run(EagerInterpreter(), source))
+
+    def test_unassigned(self):
+        program = parse('fun f(c) {\nif c {\nx := 1\n}\nret x\n}\ny := f(true)\ny := f(false)')
+        with self.assertRaises(KeyError):
+            EagerInterpreter().interpret(program)
+        env = EagerInterpreter(Environment({'x': 5})).interpret(program)
+        self.assertEqual(1, env['y'])  # f(true) assigned the global x
+
+    def test_deep_recursion(self):
+        source = 'fun f(n) {\nif n = 0 {\nret 0\n}\nret 1 + f(n - 1)\n}\nprint(f(100))'
+        self.assertEqual('100\n', run(EagerInterpreter(), source))  # too deep for the tree-walker
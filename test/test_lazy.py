@@ -0,0 +1,62 @@
+from unittest import TestCase
+from src.lexer import Lexer
+from src.parser import Parser, LazyProgram, ParseError
+from src.interpreter import Interpreter
+from src.syntaxtree import Program, Fun, If, While
+from contextlib import redirect_stdout
+from io import StringIO
+import os
+
+def parse(source, lazy):
+    return Parser(Lexer(source).lex(), lazy).parse()
+
+def eager(program):
+    # The tree with every lazy body parsed and replaced by a Program, the node an eager parse has.
+    stmts = []
+    for stmt in program.stmts:
+        if isinstance(stmt, Fun):
+            stmt = Fun(stmt.name, stmt.args, eager(stmt.body))
+        elif isinstance(stmt, If):
+            stmt = If(stmt.cond, eager(stmt.left), eager(stmt.right))
+        elif isinstance(stmt, While):
+            stmt = While(stmt.cond, eager(stmt.body))
+        stmts.append(stmt)
+    return Program(stmts)
+
+class TestLazy(TestCase):
+    def test_same_tree(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            source = f.read()
+        source += '\nfun outer(a) {\nfun inner(b) {\nif b {\nret a\n}\n}\nret inner\n}\nfun empty() {}'
+        program = parse(source, True)
+        self.assertIsNot(parse(source, False), program)  # a lazy body is a node of its own
+        self.assertEqual(parse(source, False), eager(program))
+
+    def test_parsed_on_first_call(self):
+        source = 'fun f(x) {\nfun g() {\nret x\n}\nret g() + 1\n}\nfun unused() {\nret 1 +\n}\nprint(f(1))'
+        program = parse(source, True)
+        body = program.stmts[0].body
+        self.assertIsInstance(body, LazyProgram)
+        self.assertIsNone(body.parsed)
+        out = StringIO()
+        with redirect_stdout(out):
+            Interpreter().interpret(program)
+        self.assertEqual('2\n', out.getvalue())
+        self.assertIsNotNone(body.parsed)
+        self.assertIsInstance(body.parsed[0].body, LazyProgram)
+        self.assertIsNone(program.stmts[1].body.parsed)
+
+    def test_tokens(self):
+        tokens = Lexer('fun f() {\nret 1\n}\nfun unused(x) {\nret x\n}\nprint(f())').lex()
+        program = Parser(tokens, True).parse()
+        self.assertEqual([token.text for token in tokens[17:21]], [token.text for token in program.stmts[1].body.tokens])
+        with redirect_stdout(StringIO()):
+            Interpreter().interpret(program)
+        self.assertIsNone(program.stmts[0].body.tokens)  # released once parsed
+
+    def test_errors(self):
+        program = parse('fun f() {\nx := )\n}\nf()', True)
+        with self.assertRaises(ParseError):
+            Interpreter().interpret(program)
+        with self.assertRaises(ParseError):
+            parse('fun f() {\nif true {\nret 1\n}\n', True)
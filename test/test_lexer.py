@@ -1,6 +1,8 @@
 from unittest import TestCase
-from src.lexer import Lexer
+from src.lexer import Lexer, LexError
 from src.mytoken import MyToken, TokenType
+import tempfile
+import os
 
 class TestLexer(TestCase):
     def test_arithmetic(self):
@@ -99,3 +101,46 @@ class TestLexer(TestCase):
              MyToken(TokenType.LPAREN, '(', None, 5), MyToken(TokenType.NUMBER, '3', 3, 5),
              MyToken(TokenType.RPAREN, ')', None, 5)]
         self.assertEqual(expected, lexer.lex())
+
+    def test_leading_whitespace(self):
+        lexer = Lexer(' \tx\n  y')
+        expected = [MyToken(TokenType.IDENT, 'x', 'x', 1), MyToken(TokenType.EOL, None, None, 1),
+                    MyToken(TokenType.IDENT, 'y', 'y', 2)]
+        self.assertEqual(expected, lexer.lex())
+
+    def test_string_lines(self):
+        lexer = Lexer('\'a\nb\'\nx \'open')
+        expected = [MyToken(TokenType.STRING, 'a\nb', 'a\nb', 1), MyToken(TokenType.EOL, None, None, 1),
+                    MyToken(TokenType.IDENT, 'x', 'x', 2), MyToken(TokenType.STRING, 'open', 'open', 2)]
+        self.assertEqual(expected, lexer.lex())
+
+    def test_unexpected_character(self):
+        with self.assertRaises(LexError) as context:
+            Lexer('x := 1\ny := $').lex()
+        self.assertEqual(2, context.exception.line)
+
+    def test_parallel(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            example = f.read()
+        for source in [example * 5, 'x := \'a\nb\n\'\ny := 1\n' * 20, 'a\'b\nc\'d\ne\n' * 20, 'x\n\'open\n\n', '']:
+            lexer = Lexer(source)
+            self.assertEqual(Lexer(source).lex(), list(lexer.lex_parallel(2)))
+            sequential = Lexer(source)
+            sequential.lex()
+            self.assertEqual(sequential.line, lexer.line)
+            self.assertEqual(Lexer(source).lex_buffer().lines, Lexer(source).lex_parallel(3).lines)
+            for parts in [1, 4, 50]:
+                for start, end, line in Lexer(source).split(parts):
+                    self.assertTrue(end == len(source) or source[end - 1] == '\n')
+        with self.assertRaises(LexError) as context:
+            Lexer('x := 1\n' * 50 + 'y := $\n' + 'z := %\n' * 50).lex_parallel(2)
+        self.assertEqual(51, context.exception.line)
+
+    def test_parallel_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'program.si')
+            source = 's := \'über\nx\'\nprint(s # 2)\n' * 30
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(source)
+            with Lexer.lex_file(path, workers=2) as buffer:
+                self.assertEqual(Lexer(source).lex(), list(buffer))
@@ -0,0 +1,73 @@
+from unittest import TestCase
+from src.syntaxtree import *
+from src.mytoken import TokenType
+from src.optimizer import Optimizer
+from src.lexer import Lexer
+from src.parser import Parser
+from src.interpreter import Interpreter
+import os
+import sys
+from io import StringIO
+
+def parse(source):
+    return Parser(Lexer(source).lex()).parse()
+
+def run(program):
+    saved_stdout = sys.stdout
+    try:
+        out = StringIO()
+        sys.stdout = out
+        Interpreter().interpret(program)
+        return out.getvalue()
+    finally:
+        sys.stdout = saved_stdout
+
+class TestOptimizer(TestCase):
+    def test_constant_folding(self):
+        program = parse('x := y * (2 + 3 * 4) - 2 ^ 3\nb := not (1 < 2) or y = 2\ns := \'a\' # 1.5 # true')
+        expected = Program([
+            Assign(Identifier('x'), Binary(Binary(Identifier('y'), TokenType.MUL, Literal(14)), TokenType.MINUS, Literal(8))),
+            Assign(Identifier('b'), Comparison(Identifier('y'), TokenType.EQUAL, Literal(2))),
+            Assign(Identifier('s'), Literal('a1.5true'))
+        ])
+        self.assertEqual(expected, Optimizer().optimize(program))
+
+    def test_short_circuit_folding(self):
+        program = parse('a := true or f()\nb := false and f()\nc := 1 and f()\nd := 0 or 2 < 1')
+        expected = Program([
+            Assign(Identifier('a'), Literal(True)),
+            Assign(Identifier('b'), Literal(False)),
+            Assign(Identifier('c'), FunCall(Identifier('f'), [])),
+            Assign(Identifier('d'), Literal(False))
+        ])
+        self.assertEqual(expected, Optimizer().optimize(program))
+
+    def test_errors_are_not_folded(self):
+        program = parse('if false {\nx := 1 / 0\n}\ny := 1 / 0')
+        expected = Program([Assign(Identifier('y'), Binary(Literal(1), TokenType.DIV, Literal(0)))])
+        self.assertEqual(expected, Optimizer().optimize(program))
+
+    def test_dead_branches(self):
+        program = parse('if 1 < 2 {\nx := 1\n} else {\nx := 2\n}\nwhile 2 < 1 {\nx := 3\n}\nif false {\ny := 1\n} else if y {\ny := 2\n}\n5 + 3')
+        expected = Program([
+            Assign(Identifier('x'), Literal(1)),
+            If(Identifier('y'), Program([Assign(Identifier('y'), Literal(2))]), Program([]))
+        ])
+        self.assertEqual(expected, Optimizer().optimize(program))
+
+    def test_pruning(self):
+        program = parse('fun f(x) {\nret f(x - 1)\n}\nfun g(x) {\nfun h() {\nret x\n}\nret h()\n}\nfun k() {\nret 1\n}\nprint(g(1))')
+        optimized = Optimizer().optimize(program)
+        self.assertEqual(['g'], [stmt.name.name for stmt in optimized.stmts if isinstance(stmt, Fun)])
+        self.assertEqual(program.stmts[1], optimized.stmts[0])
+        self.assertEqual(len(program.stmts), 4)
+        self.assertEqual(program, Optimizer(prune_functions=False).optimize(program))
+
+    def test_shadowed_self_reference(self):
+        program = parse('fun f() {\nfun f() {\nret 1\n}\nret f()\n}\nprint(f())')
+        self.assertEqual(program, Optimizer().optimize(program))
+
+    def test_example(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            program = parse(f.read())
+        self.assertEqual(run(program), run(Optimizer().optimize(program)))
@@ -0,0 +1,84 @@
+from unittest import TestCase
+from src.parse_cache import ParseCache
+from src.parser import Parser, ParseError
+from src.lexer import Lexer
+from src.simple_language import SimpleLanguage
+from src.syntaxtree import Binary
+from threading import Thread
+
+class TestParseCache(TestCase):
+    def test_hits(self):
+        cache = ParseCache()
+        program = cache.parse('x := 1\nprint(x)')
+        self.assertIs(program, cache.parse('x := 1\nprint(x)'))
+        self.assertEqual(str(Parser(Lexer('x := 1\nprint(x)').lex()).parse()), str(program))
+        self.assertEqual((1, 1, 0), (cache.hits, cache.misses, cache.evictions))
+        expr = cache.parse_expr('x + 1')
+        self.assertIsInstance(expr, Binary)
+        self.assertIs(expr, cache.parse_expr('x + 1'))
+        self.assertEqual((2, 2, 2), (cache.hits, cache.misses, len(cache)))
+
+    def test_eviction(self):
+        cache = ParseCache(max_entries=2)
+        first = cache.parse('a := 1')
+        cache.parse('b := 2')
+        cache.parse('a := 1')
+        cache.parse('c := 3')  # evicts 'b := 2', the least recently used
+        self.assertEqual((2, 1), (len(cache), cache.evictions))
+        self.assertIs(first, cache.parse('a := 1'))
+        cache.parse('b := 2')
+        self.assertEqual((2, 4, 2), (cache.hits, cache.misses, cache.evictions))
+
+    def test_max_bytes(self):
+        cache = ParseCache(max_bytes=12)
+        cache.parse('a := 1')
+        cache.parse("b := 'ä'")
+        self.assertEqual((1, 9), (len(cache), cache.bytes))
+        cache.parse('c := 1234567890')
+        self.assertEqual((0, 0, 3), (len(cache), cache.bytes, cache.evictions))
+
+    def test_errors(self):
+        cache = ParseCache()
+        with self.assertRaises(ParseError):
+            cache.parse_expr('x + 1 2')
+        with self.assertRaises(ParseError):
+            cache.parse('x := )')
+        for source in ['', '  ', '\n']:
+            with self.assertRaises(ParseError):
+                cache.parse_expr(source)
+        self.assertEqual(0, len(cache))
+
+    def test_threads(self):
+        cache = ParseCache(max_entries=8)
+        sources = ['x := {}\nprint(x)'.format(i) for i in range(16)]
+
+        results = [[] for _ in range(4)]
+        errors = []
+
+        def parse(result):
+            try:
+                for i in range(160):
+                    result.append(cache.parse(sources[i % len(sources)]))
+            except Exception as error:
+                errors.append(error)
+        threads = [Thread(target=parse, args=(result,)) for result in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        for i, source in enumerate(sources):
+            programs = [program for result in results for program in result[i::len(sources)]]
+            self.assertEqual(40, len(programs))
+            self.assertTrue(all(program is programs[0] for program in programs))
+            self.assertEqual(str(Parser(Lexer(source).lex()).parse()), str(programs[0]))
+        self.assertEqual(640, cache.hits + cache.misses)
+        self.assertEqual(8, len(cache))
+        self.assertLessEqual(cache.evictions, cache.misses - 8)  # two threads may miss the same source
+
+    def test_compile_program(self):
+        cache = ParseCache()
+        for x in range(3):
+            program = SimpleLanguage.compile_program('print(x * 2)', 'vm', parse_cache=cache)
+            self.assertEqual('{}\n'.format(x * 2), program.output({'x': x}))
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
@@ -2,6 +2,7 @@ from unittest import TestCase
 from src.syntaxtree import *
 from src.parser import Parser
 from src.mytoken import MyToken, TokenType
+from src.lexer import Lexer
 
 class TestParser(TestCase):
     def test_arithmetic(self):
@@ -418,3 +419,22 @@ class TestParser(TestCase):
         )
         self.assertEqual(tree, parser.parse())
 
+    def test_deep_nesting(self):
+        # nesting is not limited by the recursion limit of Python
+        n = 5000
+        expr = Parser(Lexer('-' * n + '(' * n + '2 ^ ' * n + 'f(1)' + ')' * n).lex()).parse_expr()
+        for node_class in [Unary] * n + [Grouping] * n + [Binary] * n:
+            self.assertIs(node_class, type(expr))
+            expr = expr.right if node_class is Binary else expr.expr
+        self.assertIs(FunCall(Identifier('f'), [Literal(1)]), expr)
+
+        program = Parser(Lexer('if x {\n}' + ' else if x {\n}' * n + ' else {\ny\n}').lex()).parse()
+        for _ in range(n + 1):
+            self.assertEqual(1, len(program.stmts))
+            program = program.stmts[0].right
+        self.assertEqual(Program([ExprStmt(Identifier('y'))]), program)
+
+        program = Parser(Lexer('while x {\nfun f() {\n' * n + 'ret 1' + '\n}\n}' * n).lex()).parse()
+        for _ in range(n):
+            program = program.stmts[0].body.stmts[0].body
+        self.assertEqual(Program([Ret(Literal(1))]), program)
@@ -0,0 +1,107 @@
+from src.interpreter import Interpreter
+from src.environment import Environment
+from src.purity import analyze
+from src.lexer import Lexer
+from src.parser import Parser
+import test.test_interpreter as base
+from test.test_vm import run
+from unittest import TestCase
+import sys
+import os
+
+class MemoizingInterpreter(Interpreter):
+    def __init__(self, env=None):
+        super().__init__(env, memoize=True)
+
+def parse(source):
+    return Parser(Lexer(source).lex()).parse()
+
+def memos(interpreter):
+    return {memo.function.fun.name.name: memo for memo in interpreter.memo_stats()}
+
+class TestMemoizingInterpreter(base.TestInterpreter):
+    interpreter = MemoizingInterpreter
+
+class TestPurity(TestCase):
+    def test_example(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            source = f.read()
+        self.assertEqual(run(Interpreter(), source), run(MemoizingInterpreter(), source))
+
+    def test_analyze(self):
+        def pure(source):
+            return analyze(parse(source).stmts[0]) is not None
+        self.assertTrue(pure('fun f(n) {\nif n < 2 {\nret n\n}\nret f(n - 1) + f(n - 2)\n}'))
+        self.assertTrue(pure('fun f(x) {\nr := 1\nwhile x > 0 {\nr := r * x\nx := x - 1\n}\nret r\n}'))
+        self.assertFalse(pure('fun f(x) {\nprint(x)\n}'))
+        self.assertFalse(pure('fun f(x) {\nfun g() {\nret x\n}\nret g\n}'))
+        self.assertFalse(pure('fun f(g, x) {\nret g(x)\n}'))
+
+    def test_fib(self):
+        interpreter = MemoizingInterpreter()
+        env = interpreter.interpret(parse('fun fib(n) {\nif n < 2 {\nret n\n}\nret fib(n - 1) + fib(n - 2)\n}\nx := fib(60)'))
+        self.assertEqual(1548008755920, env['x'])
+        memo = memos(interpreter)['fib']
+        self.assertEqual((61, 58), (memo.misses, memo.hits))
+
+    def test_arguments(self):
+        interpreter = MemoizingInterpreter()
+        env = interpreter.interpret(parse('fun f(x) {\nret x # \'\'\n}\na := f(1)\nb := f(1.0)\nc := f(true)\nd := f(1)'))
+        self.assertEqual(['1', '1.0', 'true', '1'], [env[name] for name in 'abcd'])
+        self.assertEqual((3, 1), (memos(interpreter)['f'].misses, memos(interpreter)['f'].hits))
+
+    def test_impure(self):
+        source = ('fun p(x) {\nprint(x)\nret x\n}\nfun f(x) {\nret p(x)\n}\n'
+                  'count := 0\nfun g(x) {\ncount := count + 1\nret x\n}\nf(1)\nf(1)\ng(1)\ng(1)\nprint(count)')
+        interpreter = MemoizingInterpreter()
+        self.assertEqual('1\n1\n2\n', run(interpreter, source))
+        self.assertEqual(0, memos(interpreter)['f'].hits)
+        self.assertEqual(0, memos(interpreter)['g'].hits)  # 'count' is defined outside of g
+
+    def test_rebinding(self):
+        source = ('k := 2\nfun scale(x) {\nret x * k\n}\nfun f(x) {\nret scale(x) + 1\n}\n'
+                  'a := f(1)\nb := f(1)\nk := 3\nc := f(1)\nfun scale(x) {\nprint(x)\nret x\n}\nd := f(1)\ne := f(1)')
+        interpreter = MemoizingInterpreter()
+        self.assertEqual('1\n1\n', run(interpreter, source))
+        env = interpreter.globals
+        self.assertEqual([3, 3, 4, 2, 2], [env[name] for name in 'abcde'])
+        memo = memos(interpreter)['f']
+        self.assertEqual((1, 2), (memo.hits, memo.invalidations))
+
+    def test_eviction(self):
+        interpreter = Interpreter(memoize=True, memo_size=2)
+        interpreter.interpret(parse('fun f(x) {\nret x + 1\n}\nf(1)\nf(2)\nf(1)\nf(3)\nf(2)'))
+        memo = memos(interpreter)['f']
+        self.assertEqual((1, 4, 2), (memo.hits, memo.misses, memo.evictions))
+
+    def test_negative_zero(self):
+        source = 'fun f(x) {\nret x\n}\nprint(f(0.0))\nprint(f(-0.0))\nprint(f(-0.0))'
+        self.assertEqual(run(Interpreter(), source), run(MemoizingInterpreter(), source))
+        self.assertEqual('0.0\n-0.0\n-0.0\n', run(MemoizingInterpreter(), source))
+
+    def test_switched_off(self):
+        interpreter = Interpreter(memoize=True, memo_size=16)
+        env = interpreter.interpret(parse('fun f(x) {\nret x * 2\n}\ni := 0\nwhile i < 100 {\ny := f(i)\ni := i + 1\n}'))
+        self.assertEqual(198, env['y'])
+        memo = memos(interpreter)['f']
+        self.assertFalse(memo.active)
+        self.assertEqual((0, 17, 0), (memo.hits, memo.misses, len(memo.results)))
+
+    def test_recursion_depth(self):
+        # a call takes as many Python frames as without memos and tail calls: 95 calls fit in 1000 frames
+        program = parse('fun f(n) {\nif n = 0 {\nret 0\n}\nret 1 + f(n - 1)\n}\nx := f(95)')
+        frame, depth = sys._getframe(), 0
+        while frame is not None:
+            frame, depth = frame.f_back, depth + 1
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(depth + 1000)
+        try:
+            for memoize in [False, True]:
+                self.assertEqual(95, Interpreter(jit_threshold=None, memoize=memoize).interpret(program)['x'])
+        finally:
+            sys.setrecursionlimit(limit)
+
+    def test_opt_in(self):
+        interpreter = Interpreter()
+        interpreter.interpret(parse('fun f(x) {\nret x\n}\nf(1)\nf(1)'))
+        self.assertEqual([], interpreter.memo_stats())
@@ -0,0 +1,59 @@
+from unittest import TestCase
+from src.resolver import Resolver, UnassignedError
+from src.lexer import Lexer
+from src.parser import Parser
+from src.interpreter import Interpreter
+from src.vm import VM
+from src.closure_compiler import ClosureInterpreter
+
+def parse(source):
+    return Parser(Lexer(source).lex()).parse()
+
+class TestResolver(TestCase):
+    def test_scopes(self):
+        # a := 1\nfun f(x) {y := x\na := y\nfun g() {y := a + x\nz := y}}
+        program = parse('a := 1\nfun f(x) {\ny := x\na := y\nfun g() {\ny := a + x\nz := y\n}\n}')
+        f = program.stmts[1]
+        g = f.body.stmts[2]
+        resolver = Resolver()
+        resolver.declare_globals(program)
+        self.assertEqual(['x', 'y', 'g'], resolver.begin_function(f).names)
+        self.assertEqual(['z'], resolver.begin_function(g).names)
+        self.assertEqual((1, 0), resolver.resolve('x'))
+        self.assertEqual((1, 1), resolver.resolve('y'))
+        self.assertEqual((0, 0), resolver.resolve('z'))
+        self.assertIsNone(resolver.resolve('a'))
+        resolver.end_function()
+        self.assertEqual((0, 2), resolver.resolve('g'))
+        resolver.end_function()
+        self.assertIsNone(resolver.resolve('x'))
+
+    def test_declared_in_branches(self):
+        program = parse('fun f(c) {\nif c {\nx := 1\n} else {\nwhile c {\ny := 2\n}\n}\n}')
+        resolver = Resolver(['y'])
+        resolver.declare_globals(program)
+        self.assertEqual(['c', 'x'], resolver.begin_function(program.stmts[0]).names)
+
+    def test_unassigned(self):
+        program = parse('fun f(c) {\nif c {\nx := 1\n}\nret x\n}\ny := f(false)')
+        for interpreter in [VM(), ClosureInterpreter()]:
+            with self.assertRaises(UnassignedError):
+                interpreter.interpret(program)
+            self.assertEqual(1, interpreter.interpret(parse('fun f(c) {\nif c {\nx := 1\n}\nret x\n}\ny := f(true)'))['y'])
+
+    def test_deep_closures(self):
+        source = 'fun a(x) {\nfun b(y) {\nfun c(z) {\nx := x + 1\nret x + y + z\n}\nret c\n}\nret b\n}\nf := a(1)(10)\nr1 := f(100)\nr2 := f(100)'
+        for interpreter in [VM(), ClosureInterpreter()]:
+            env = interpreter.interpret(parse(source))
+            self.assertEqual(112, env['r1'])
+            self.assertEqual(113, env['r2'])
+
+    def test_assigned_later(self):
+        # the tree-walker decides whether 'x := 1' creates a local when set() runs, the resolver
+        # when it is compiled; they agree unless the enclosing scope first assigns x afterwards
+        source = 'fun set() {\nx := 1\n}\nset()\nif false {\nx := 0\n}'
+        for interpreter in [Interpreter(), VM(), ClosureInterpreter()]:
+            self.assertEqual(1, interpreter.interpret(parse('x := 0\n' + source))['x'])
+        self.assertNotIn('x', Interpreter().interpret(parse(source)))
+        for interpreter in [VM(), ClosureInterpreter()]:
+            self.assertEqual(1, interpreter.interpret(parse(source))['x'])
@@ -0,0 +1,106 @@
+from unittest import TestCase, mock
+from src.simple_language import SimpleLanguage
+from src.lexer import Lexer
+from src.parser import Parser
+from src.optimizer import Optimizer
+from src.interpreter import Interpreter
+from src.sic import SicWriter, SicError, read_sic, parse_cached, cache_path, header
+from test.test_vm import run
+from io import StringIO
+import src.sic
+import tempfile
+import hashlib
+import shutil
+import sys
+import os
+
+def parse(source):
+    return Parser(Lexer(source).lex()).parse()
+
+class TestSic(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'example.si')
+        shutil.copy(os.path.join(os.path.dirname(__file__), 'example.si'), self.path)
+        with open(self.path) as f:
+            self.source = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        source = 'x := 2 ^ 70 - 1.5 # \'é\' # true\nprint(not -x <= 9223372036854775808)'
+        for program in [parse(self.source), Optimizer().optimize(parse(self.source)), parse(source),
+                        Optimizer().optimize(parse(source))]:
+            data = SicWriter().write(program, bytes(32))
+            self.assertEqual(program, read_sic(data, bytes(32)))
+            self.assertIsNone(read_sic(data, bytes(31) + b'\1'))
+        power = read_sic(SicWriter().write(parse(source), bytes(32)), bytes(32)).stmts[0].right.left.left.left
+        self.assertIs(int, type(power.left.value))  # 2 and 2.0 are different constants
+        zeros = Optimizer().optimize(parse('print(0.0)\nprint(-0.0)'))
+        self.assertIs(zeros, read_sic(SicWriter().write(zeros, bytes(32)), bytes(32)))
+
+    def test_load_skips_parser(self):
+        program = parse_cached(self.path)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'example.sic')))
+        with mock.patch.object(src.sic, 'Parser') as parser, mock.patch.object(src.sic, 'Lexer') as lexer:
+            self.assertEqual(program, parse_cached(self.path))
+            parser.assert_not_called()
+            lexer.assert_not_called()
+
+    def test_invalidation(self):
+        parse_cached(self.path)
+        with open(self.path, 'w') as f:
+            f.write('print(1)')
+        self.assertEqual(parse('print(1)'), parse_cached(self.path))
+        with mock.patch.object(src.sic, 'version', src.sic.version + 1):
+            with mock.patch.object(src.sic, 'Parser', wraps=Parser) as parser:
+                self.assertEqual(parse('print(1)'), parse_cached(self.path))
+                parser.assert_called_once()
+        with open(cache_path(self.path), 'r+b') as f:
+            f.truncate(os.path.getsize(cache_path(self.path)) - 1)
+        self.assertEqual(parse('print(1)'), parse_cached(self.path))
+
+    def test_corrupt_body(self):
+        program = parse_cached(self.path)
+        with open(cache_path(self.path), 'r+b') as f:
+            data = bytearray(f.read())
+            args = len(data) - header.unpack_from(data)[-1]
+            data[args:args + 4] = b'\xff' * 4  # the constant of the first node
+            f.seek(0)
+            f.write(data)
+        with self.assertRaises(SicError):
+            read_sic(bytes(data), hashlib.sha256(self.source.encode()).digest())
+        self.assertEqual(program, parse_cached(self.path))
+
+    def test_cache_dir(self):
+        cache_dir = os.path.join(self.directory, 'cache')
+        program = parse_cached(self.path, cache_dir)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'example.sic')))
+        with open(cache_path(self.path, cache_dir), 'rb') as f:
+            self.assertEqual(program, read_sic(f.read(), hashlib.sha256(self.source.encode()).digest()))
+        self.assertEqual([os.path.basename(cache_path(self.path, cache_dir))], os.listdir(cache_dir))
+
+    def test_same_name(self):
+        cache_dir = os.path.join(self.directory, 'cache')
+        paths = []
+        for directory, source in [('a', 'print(1)'), ('b', 'print(2)')]:
+            os.mkdir(os.path.join(self.directory, directory))
+            paths.append(os.path.join(self.directory, directory, 'main.si'))
+            with open(paths[-1], 'w') as f:
+                f.write(source)
+        self.assertNotEqual(cache_path(paths[0], cache_dir), cache_path(paths[1], cache_dir))
+        for _ in range(2):
+            self.assertEqual([parse('print(1)'), parse('print(2)')], [parse_cached(path, cache_dir) for path in paths])
+        self.assertEqual(2, len(os.listdir(cache_dir)))
+
+    def test_interpret_file(self):
+        expected = run(Interpreter(), self.source)
+        for _ in range(2):  # writes the cache, then loads it
+            saved_stdout = sys.stdout
+            try:
+                sys.stdout = StringIO()
+                SimpleLanguage.interpret_file(self.path, cache=True)
+                self.assertEqual(expected, sys.stdout.getvalue())
+            finally:
+                sys.stdout = saved_stdout
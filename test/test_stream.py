@@ -0,0 +1,64 @@
+from unittest import TestCase
+from src.simple_language import SimpleLanguage
+from src.lexer import Lexer
+from src.parser import Parser
+from src.token_buffer import TokenStream
+from test.test_vm import run
+from src.interpreter import Interpreter
+from io import StringIO
+import sys
+import os
+
+class LineReader:
+    # A file object handing out one line per read, like a pipe, that records the output printed so far.
+    def __init__(self, source, out):
+        self.lines = source.splitlines(keepends=True)
+        self.out = out
+        self.outputs = []
+
+    def read(self, size):
+        self.outputs.append(self.out.getvalue())
+        return self.lines.pop(0) if self.lines else ''
+
+def interpret_lines(source, optimize=False):
+    saved_stdout = sys.stdout
+    try:
+        out = StringIO()
+        sys.stdout = out
+        reader = LineReader(source, out)
+        SimpleLanguage.interpret_stream(reader, optimize)
+        return out.getvalue(), reader
+    finally:
+        sys.stdout = saved_stdout
+
+class TestStream(TestCase):
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            self.example = f.read()
+
+    def test_lex_stream(self):
+        for chunk_size in [1, 2, 7, 1 << 16]:
+            self.assertEqual(Lexer(self.example).lex(), list(Lexer('').lex_stream(StringIO(self.example), chunk_size)))
+
+    def test_parse_stream(self):
+        tokens = TokenStream(Lexer('').lex_stream(StringIO(self.example), 5))
+        parser = Parser(tokens)
+        stmts = []
+        for stmt in parser.statements():
+            tokens.release(parser.index)
+            stmts.append(stmt)
+            self.assertLess(len(tokens.window), 3)
+        self.assertEqual(Parser(Lexer(self.example).lex()).parse().stmts, stmts)
+
+    def test_interpret_stream(self):
+        expected = run(Interpreter(), self.example)
+        for optimize in [False, True]:
+            output, reader = interpret_lines(self.example, optimize)
+            self.assertEqual(expected, output)
+        output, reader = interpret_lines('print(1)\nx := 2\nprint(x)\n')
+        self.assertEqual(['', '1\n', '1\n', '1\n2\n'], reader.outputs)  # every line is run before the next one is read
+
+    def test_ret(self):
+        output, reader = interpret_lines('print(1)\nif true {\nret 0\n}\nprint(2)\n')
+        self.assertEqual('1\n', output)
+        self.assertEqual(['print(2)\n'], reader.lines)
@@ -0,0 +1,59 @@
+from unittest import TestCase
+from src.syntaxtree import *
+from src.mytoken import TokenType
+from src.lexer import Lexer
+from src.parser import Parser
+import pickle
+import copy
+import gc
+
+class TestSyntaxTree(TestCase):
+    def test_slots(self):
+        node = Binary(Literal(1), TokenType.PLUS, Identifier('x'))
+        self.assertFalse(hasattr(node, '__dict__'))
+        self.assertIs(node, copy.deepcopy(node))
+        with self.assertRaises(AttributeError):
+            node.unknown = 1
+
+    def test_interned(self):
+        self.assertIs(Literal(1), Literal(1))
+        self.assertIs(Identifier('x'), Identifier('x'))
+        self.assertIsNot(Literal(1), Literal(1.0))
+        self.assertIsNot(Literal(1), Literal(True))
+        self.assertIs(float, type(Literal(1.0).value))
+        self.assertNotEqual(Literal(1), Literal(1.0))
+        self.assertIsNot(Literal(0.0), Literal(-0.0))
+        self.assertEqual('-0.0', str(Literal(-0.0).value))
+        self.assertIs(Literal(float('nan')), Literal(float('nan')))
+
+    def test_hash_consed(self):
+        source = 'fun f(x) {\nret x * (x + 1)\n}\nprint(f(2) < f(3))'
+        program = Parser(Lexer(source).lex()).parse()
+        self.assertIs(program, Parser(Lexer(source).lex()).parse())
+        self.assertIs(program.stmts[0], Fun(Identifier('f'), [Identifier('x')], program.stmts[0].body))
+        other = Parser(Lexer(source.replace('3', '4')).lex()).parse()
+        self.assertIsNot(program, other)
+        self.assertIs(program.stmts[0], other.stmts[0])
+        self.assertEqual({program: 1}, {Parser(Lexer(source).lex()).parse(): 1})
+        self.assertIsNot(FunCall(Identifier('f'), [Literal(1)]), FunCall(Identifier('f'), [Literal(1), Literal(2)]))
+
+    def test_deep(self):
+        expr = Literal(0)
+        for _ in range(100000):
+            expr = Binary(expr, TokenType.PLUS, Literal(1))
+        other = Literal(0)
+        for _ in range(100000):
+            other = Binary(other, TokenType.PLUS, Literal(1))
+        self.assertEqual(expr, other)
+        self.assertEqual(hash(expr), hash(other))
+
+    def test_released(self):
+        Identifier('only_used_here')
+        gc.collect()
+        self.assertNotIn((str, 'only_used_here'), Identifier.instances)
+
+    def test_copy(self):
+        program = Program([Assign(Identifier('x'), Grouping(Literal('s')))])
+        self.assertEqual(program, pickle.loads(pickle.dumps(program)))
+        self.assertIs(program, pickle.loads(pickle.dumps(program)))
+        self.assertIs(program, copy.deepcopy(program))
@@ -0,0 +1,36 @@
+from unittest import TestCase
+from src.lexer import Lexer, LexError
+from src.parser import Parser
+from src.token_buffer import TokenBuffer
+import tempfile
+import os
+
+class TestTokenBuffer(TestCase):
+    def test_same_tokens(self):
+        source = 'x:= 7.5 <= y\nfun f(a, b) {\nret a # \'héllo\' ^ -b\n}\nif not true or false {\n}: z >= 1'
+        buffer = Lexer(source).lex_buffer()
+        self.assertIsInstance(buffer, TokenBuffer)
+        self.assertEqual(Lexer(source).lex(), list(buffer))
+        self.assertEqual(Lexer(source).lex(), list(Lexer(source.encode()).lex_buffer()))
+
+    def test_parse(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            source = f.read()
+        self.assertEqual(Parser(Lexer(source).lex()).parse(), Parser(Lexer(source).lex_buffer()).parse())
+
+    def test_lex_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'program.si')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('s := \'über\'\nprint(s # 2)')
+            with Lexer.lex_file(path) as buffer:
+                self.assertEqual(Lexer('s := \'über\'\nprint(s # 2)').lex(), list(buffer))
+                self.assertEqual('über', buffer[2].value)
+                self.assertEqual(2, buffer[5].line)
+            empty = os.path.join(directory, 'empty.si')
+            open(empty, 'w').close()
+            self.assertEqual(0, len(Lexer.lex_file(empty)))
+
+    def test_unexpected_character(self):
+        with self.assertRaises(LexError):
+            Lexer(b'x := $').lex_buffer()
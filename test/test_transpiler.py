@@ -0,0 +1,72 @@
+from src.transpiler import Transpiler, TranspileError
+from src.simple_language import SimpleLanguage
+from src.interpreter import Interpreter
+from src.lexer import Lexer
+from src.parser import Parser
+from test.test_vm import run
+from unittest import TestCase
+from io import StringIO
+import importlib.util
+import tempfile
+import sys
+import os
+
+def transpile_and_run(source):
+    code = compile(Transpiler().transpile(Parser(Lexer(source).lex()).parse()), '<transpiled>', 'exec')
+    namespace = {}
+    saved_stdout = sys.stdout
+    try:
+        out = StringIO()
+        sys.stdout = out
+        exec(code, namespace)
+        return out.getvalue()
+    finally:
+        sys.stdout = saved_stdout
+
+class TestTranspiler(TestCase):
+    def assertSameOutput(self, source):
+        self.assertEqual(run(Interpreter(), source), transpile_and_run(source))
+
+    def test_example(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            self.assertSameOutput(f.read())
+
+    def test_formatting(self):
+        source = 'print(true)\nprint(1 < 0)\nprint(3 / 2)\nprint(2 ^ 0.5)\nprint(\'a\' # false # 1.0)\nprint(-7)'
+        self.assertEqual(6, len(Parser(Lexer(source).lex()).parse().stmts))
+        self.assertSameOutput(source)
+
+    def test_closures(self):
+        self.assertSameOutput('fun counter() {\nn := 0\nfun inc() {\nn := n + 1\nret n\n}\nret inc\n}\n'
+                              'c := counter()\nd := counter()\nc()\nc()\nprint(c())\nprint(d())')
+        self.assertSameOutput('total := 0\nfun add(x) {\nfun set() {\ntotal := total + x\n}\nset()\n}\nadd(4)\nadd(5)\nprint(total)')
+
+    def test_names(self):
+        self.assertSameOutput('class := 1\nclass_ := 2\nto_string := 3\nfun def(lambda) {\nret lambda + class\n}\nprint(def(class_ + to_string))')
+
+    def test_shadowed_builtins(self):
+        self.assertSameOutput('str := 1\nprint(str)\nprint(2.5 # \'a\')\nint := 2\nprint(int)\nprint(true)')
+        self.assertSameOutput('old := print\nfun print(x) {\nold(x # \'!\')\n}\nprint(1)\nbuiltins := 0\nprint(builtins)')
+
+    def test_tail_calls(self):
+        self.assertSameOutput('fun loop(n) {\nif n = 0 {\nret \'done\'\n}\nret loop(n - 1)\n}\nprint(loop(5000))')
+        self.assertSameOutput('fun even(n) {\nif n = 0 {\nret true\n}\nret (odd(n - 1))\n}\n'
+                              'fun odd(n) {\nif n = 0 {\nret false\n}\nret even(n - 1)\n}\nprint(even(3000))\nprint(odd(7))')
+        self.assertSameOutput('fun f(x) {\nret x + 1\n}\nfun g(x) {\nret f(x)\n}\nfun h() {\nret print(g(1))\n}\nh()\nprint(g(2) * 2)')
+
+    def test_ret_outside_function(self):
+        with self.assertRaises(TranspileError):
+            Transpiler().transpile(Parser(Lexer('ret 1').lex()).parse())
+
+    def test_compile_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'module.si')
+            out = os.path.join(directory, 'module.py')
+            with open(path, 'w') as f:
+                f.write('fun square(x) {\nret x * x\n}\nanswer := square(6) + 6')
+            SimpleLanguage.compile_file(path, out)
+            spec = importlib.util.spec_from_file_location('module', out)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        self.assertEqual(42, module.answer)
+        self.assertEqual(9, module.square(3))
@@ -0,0 +1,94 @@
+from unittest import TestCase, skipIf
+from src.interpreter import Interpreter
+from src.environment import Environment
+from src.lexer import Lexer
+from src.parser import Parser
+from array import array
+import src.vectorize as vectorize
+
+def expr(source):
+    return Parser(Lexer(source).lex()).parse().stmts[0].expr
+
+class TestVectorizeLists(TestCase):
+    # without NumPy the columns are evaluated as lists
+    def setUp(self):
+        self.numpy = vectorize.numpy
+        vectorize.numpy = None
+        self.interpreter = Interpreter()
+        self.interpreter.interpret(Parser(Lexer('fun double(a) {\nret a * 2\n}\nk := 10').lex()).parse())
+
+    def tearDown(self):
+        vectorize.numpy = self.numpy
+
+    def per_row(self, source, columns):
+        names = list(columns)
+        return [self.interpreter.execute(expr(source), Environment(dict(zip(names, row)), self.interpreter.globals))
+                for row in zip(*columns.values())]
+
+    def evaluate(self, source, columns):
+        return [value.item() if hasattr(value, 'item') else value
+                for value in vectorize.evaluate_columns(expr(source), columns, self.interpreter)]
+
+    def assert_like_interpreter(self, source, columns):
+        expected = self.per_row(source, columns)
+        result = self.evaluate(source, columns)
+        self.assertEqual(expected, result)
+        self.assertEqual([type(value) for value in expected], [type(value) for value in result])
+
+    def test_arithmetic(self):
+        columns = {'x': [1, 2, -3, 4], 'y': [0.5, 2.0, 1.0, -4.0]}
+        for source in ['x + y * 2', 'x / y', 'x ^ 2 - y', '-x', '+y', 'x / 2', '(x - 1) * k', 'x ^ -1']:
+            self.assert_like_interpreter(source, columns)
+        self.assert_like_interpreter('x + 1', {'x': array('d', [1.5, 2.5])})
+        self.assert_like_interpreter('x + x', {'x': [True, False, True]})
+
+    def test_comparison(self):
+        columns = {'x': [1, 2, 3], 'y': [3, 2, 1]}
+        for source in ['x < y', 'x <= y', 'x > y', 'x >= y', 'x = y', '(x < y) = (y > x)', 'not x = 2']:
+            self.assert_like_interpreter(source, columns)
+
+    def test_logical(self):
+        columns = {'x': [0, 1, 2, -1], 'y': [1, 0, 2, 3]}
+        for source in ['x > 0 and y > 0', 'x > 0 or y', 'x and y', 'x or y', 'not x', 'x = 1 or not y']:
+            self.assert_like_interpreter(source, columns)
+
+    def test_short_circuit(self):
+        columns = {'x': [0, 1, 2, 0]}
+        self.assert_like_interpreter('x > 0 and 1 / x > 0.6', columns)
+        self.assert_like_interpreter('x = 0 or 2 / x = 1', columns)
+
+    def test_per_row(self):
+        columns = {'x': [1, 2, 3], 's': ['a', 'b', 'c']}
+        for source in ['double(x) + k', 's # x', "s = 'b' and double(x)", 'not s']:
+            self.assert_like_interpreter(source, columns)
+        with self.assertRaises(ZeroDivisionError):
+            self.evaluate('1 / (x - 2)', columns)
+
+    def test_big_integers(self):
+        self.assert_like_interpreter('x ^ 30 + 1', {'x': [10, 3]})
+        self.assert_like_interpreter('x * 2', {'x': [2 ** 62, 1]})
+        self.assert_like_interpreter('-x - 1', {'x': [-2 ** 63, 5]})
+        self.assert_like_interpreter('x + 1', {'x': [2 ** 70, 1]})
+        self.assert_like_interpreter('x - 1', {'x': array('I', [0, 5])})
+        self.assertEqual([2 ** 64 + 1, 2], self.evaluate('2 ^ 64 + x', {'x': [1, 2 - 2 ** 64]}))
+
+    def test_constant(self):
+        self.assertEqual([3, 3], self.evaluate('1 + 2', {'x': [0, 0]}))
+
+    def test_columns(self):
+        with self.assertRaises(ValueError):
+            self.evaluate('-x', {})
+        with self.assertRaises(ValueError):
+            self.evaluate('x + y', {'x': [1, 2], 'y': [1]})
+
+@skipIf(vectorize.numpy is None, 'NumPy is not installed')
+class TestVectorizeNumPy(TestVectorizeLists):
+    def setUp(self):
+        super().setUp()
+        vectorize.numpy = self.numpy
+
+    def test_arrays(self):
+        numpy = self.numpy
+        result = vectorize.evaluate_columns(expr('x * 2 > y'), {'x': numpy.arange(5), 'y': numpy.full(5, 4)})
+        self.assertIs(numpy.ndarray, type(result))
+        self.assertEqual([False, False, False, True, True], result.tolist())
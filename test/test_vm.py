@@ -0,0 +1,52 @@
+from src.vm import VM
+from src.interpreter import Interpreter
+from src.lexer import Lexer
+from src.parser import Parser
+from src.optimizer import Optimizer
+import test.test_interpreter as base
+from unittest import TestCase
+import os
+import math
+import sys
+from io import StringIO
+
+def run(interpreter, source):
+    saved_stdout = sys.stdout
+    try:
+        out = StringIO()
+        sys.stdout = out
+        interpreter.interpret(Parser(Lexer(source).lex()).parse())
+        return out.getvalue()
+    finally:
+        sys.stdout = saved_stdout
+
+class TestVM(base.TestInterpreter):
+    interpreter = VM
+
+class TestVMProgram(TestCase):
+    def test_example(self):
+        with open(os.path.join(os.path.dirname(__file__), 'example.si')) as f:
+            source = f.read()
+        self.assertEqual(run(Interpreter(), source), run(VM(), source))
+
+    def test_nested_control_flow(self):
+        source = 'i := 0\ns := 0\nwhile i < 10 {\nif i < 5 {\ns := s + i\n} else {\nif i = 7 {\ns := s * 2\n}\n}\ni := i + 1\n}\nprint(s)'
+        self.assertEqual('20\n', run(VM(), source))
+
+    def test_constants(self):
+        program = Optimizer().optimize(Parser(Lexer('print(0.0)\nprint(-0.0)\nprint(0)\nprint(false)').lex()).parse())
+        saved_stdout = sys.stdout
+        try:
+            sys.stdout = StringIO()
+            VM().interpret(program)
+            self.assertEqual('0.0\n-0.0\n0\nfalse\n', sys.stdout.getvalue())
+        finally:
+            sys.stdout = saved_stdout
+
+    def test_deep_recursion(self):
+        source = 'fun facrec(x) {\nif x = 0 {\nret 1\n} else {\nret facrec(x-1) * x\n}\n}\ny := facrec(10000)'
+        env = VM().interpret(Parser(Lexer(source).lex()).parse())
+        self.assertEqual(math.factorial(10000), env['y'])
+
+        source = 'fun depth(n) {\nif n = 0 {\nret 0\n}\nret 1 + depth(n - 1)\n}\nfun last(n) {\nret print(depth(n))\n}\nlast(50000)'
+        self.assertEqual('50000\n', run(VM(), source))